@@ -40,12 +40,23 @@ const MedicationItem: React.FC<MedicationItemProps> = ({ medication }) => {
     setEditDialogOpen(false);
   };
 
+  // Resized derivatives are generated in the background; until they exist
+  // the original upload is shown instead
+  const variants = medication.image_variants;
+  const imageSrc = variants?.thumbnail ?? medication.image;
+
   return (
     <div className={styles.medicationItem}>
-      {medication.image && (
+      {imageSrc && (
         <img
-          src={medication.image}
+          src={imageSrc}
+          srcSet={
+            variants?.thumbnail && variants.medium
+              ? `${variants.thumbnail} 1x, ${variants.medium} 2x`
+              : undefined
+          }
           alt={medication.name}
+          loading="lazy"
           className={styles.medicationImage}
         />
       )}
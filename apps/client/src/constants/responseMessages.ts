@@ -21,4 +21,8 @@ export const RESPONSE_MESSAGES: Record<string, string> = {
   S011: 'Medication updated successfully.',
   S012: 'Refill request updated successfully.',
   S013: 'Refill request aggregate data retrieved successfully.',
+  S014: 'Refill request analytics retrieved successfully.',
+  S015: 'Metrics retrieved successfully.',
+  E009: 'Media file not found.',
+  S016: 'Medications imported successfully.',
 };
@@ -5,44 +5,72 @@ import { toast } from 'react-toastify';
 
 export const useFetchMedications = () => {
   const [medications, setMedications] = useState<Medication[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState<boolean>(false);
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
   const [error, setError] = useState<string | null>(null);
   const hasFetched = useRef(false);
 
+  // Fetch one page; without a cursor the list restarts from the first page
+  const loadPage = async (cursor: string | null) => {
+    const response = await fetchMedications(cursor);
+    const data = await response.json();
+
+    if (!response.ok) {
+      const errorCode: string = data.code || 'E000';
+      throw new Error(RESPONSE_MESSAGES[errorCode]);
+    }
+
+    const page = data.data as Medication[];
+    setMedications((current) => (cursor ? [...current, ...page] : page));
+    setNextCursor(data.next ?? null);
+  };
+
+  const handleError = (err: unknown) => {
+    const message =
+      err instanceof Error ? err.message : RESPONSE_MESSAGES['E000'];
+    setError(message);
+    toast.error(message);
+  };
+
   const loadMedications = async () => {
     setLoading(true);
     setError(null);
     try {
-      const response = await fetchMedications();
-      const data = await response.json();
-
-      if (response.ok) {
-        setMedications(data.data as Medication[]);
-        if (!hasFetched.current) {
-          toast.success(RESPONSE_MESSAGES['S005']);
-          hasFetched.current = true;
-        }
-      } else {
-        const errorCode: string = data.code || 'E000';
-        throw new Error(RESPONSE_MESSAGES[errorCode]);
+      await loadPage(null);
+      if (!hasFetched.current) {
+        toast.success(RESPONSE_MESSAGES['S005']);
+        hasFetched.current = true;
       }
     } catch (err) {
-      if (err instanceof Error) {
-        setError(err.message);
-        toast.error(err.message);
-      } else {
-        const fallbackError = RESPONSE_MESSAGES['E000'];
-        setError(fallbackError);
-        toast.error(fallbackError);
-      }
+      handleError(err);
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      await loadPage(nextCursor);
+    } catch (err) {
+      handleError(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     loadMedications();
   }, []);
 
-  return { medications, loading, error };
+  return {
+    medications,
+    loading,
+    error,
+    hasMore: nextCursor !== null,
+    loadMore,
+    loadingMore,
+  };
 };
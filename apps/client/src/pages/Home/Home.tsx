@@ -6,7 +6,8 @@ import styles from './Home.module.scss';
 import Spinner from '../../components/Spinner/Spinner';
 
 const Home: React.FC = () => {
-  const { medications, loading, error } = useFetchMedications();
+  const { medications, loading, error, hasMore, loadMore, loadingMore } =
+    useFetchMedications();
 
   return (
     <>
@@ -16,6 +17,18 @@ const Home: React.FC = () => {
         {loading && <Spinner loading={loading} />}
         {error && <p className={styles.error}>{error}</p>}
         {!loading && !error && <MedicationList medications={medications} />}
+        {!loading && hasMore && (
+          <div className={styles.loadMore}>
+            <button
+              type="button"
+              className={styles.submitButton}
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
     </>
   );
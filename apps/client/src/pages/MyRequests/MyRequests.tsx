@@ -8,61 +8,104 @@ import Spinner from '../../components/Spinner/Spinner';
 import styles from './MyRequests.module.scss';
 import { RESPONSE_MESSAGES } from '../../constants/responseMessages';
 
+const STATUS_OPTIONS = ['PENDING', 'APPROVED', 'DENIED'];
+
 const MyRequestsPage: React.FC = () => {
   const [requests, setRequests] = useState<RefillRequest[]>([]);
+  const [status, setStatus] = useState<string>('');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState<boolean>(true);
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
 
-  useEffect(() => {
-    const loadRequests = async () => {
-      setLoading(true);
-      try {
-        const response = await fetchRefillRequests();
-        if (response.ok) {
-          const data = await response.json();
-          setRequests(data.data);
+  // Fetch one page; without a cursor the list restarts from the first page
+  const loadPage = async (cursor: string | null) => {
+    try {
+      const response = await fetchRefillRequests({ status }, cursor);
+      if (response.ok) {
+        const data = await response.json();
+        const page = data.data as RefillRequest[];
+        setRequests((current) => (cursor ? [...current, ...page] : page));
+        setNextCursor(data.next ?? null);
+        if (!cursor) {
           toast.success(RESPONSE_MESSAGES['S009']); // Refill requests loaded successfully
-        } else {
-          const errorData = await response.json();
-          const errorCode = errorData.code || 'E000';
-          toast.error(RESPONSE_MESSAGES[errorCode]);
         }
-      } catch {
-        toast.error(RESPONSE_MESSAGES['E000']);
-      } finally {
-        setLoading(false);
+      } else {
+        const errorData = await response.json();
+        const errorCode = errorData.code || 'E000';
+        toast.error(RESPONSE_MESSAGES[errorCode]);
       }
+    } catch {
+      toast.error(RESPONSE_MESSAGES['E000']);
+    }
+  };
+
+  useEffect(() => {
+    const loadRequests = async () => {
+      setLoading(true);
+      await loadPage(null);
+      setLoading(false);
     };
 
     loadRequests();
-  }, []);
+  }, [status]);
+
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    await loadPage(nextCursor);
+    setLoadingMore(false);
+  };
 
   return (
     <div className={styles.myRequestsPage}>
       <h1>My Refill Requests</h1>
+      <label className={styles.filter}>
+        Status:{' '}
+        <select value={status} onChange={(e) => setStatus(e.target.value)}>
+          <option value="">All</option>
+          {STATUS_OPTIONS.map((option) => (
+            <option key={option} value={option}>
+              {option}
+            </option>
+          ))}
+        </select>
+      </label>
       {loading ? (
         <Spinner loading={true} />
       ) : requests.length > 0 ? (
-        <ul className={styles.requestList}>
-          {requests.map((request) => (
-            <li key={request.id} className={styles.requestItem}>
-              <p>Medication: {request.medication.name}</p>
-              <p>Quantity: {request.quantity}</p>
-              <p>Status: {request.status}</p>
-              <p>
-                Requested At:{' '}
-                {new Date(request.requested_at).toLocaleString('en-US', {
-                  year: 'numeric',
-                  month: 'long',
-                  day: 'numeric',
-                  hour: '2-digit',
-                  minute: '2-digit',
-                  second: '2-digit',
-                  hour12: true,
-                })}
-              </p>
-            </li>
-          ))}
-        </ul>
+        <>
+          <ul className={styles.requestList}>
+            {requests.map((request) => (
+              <li key={request.id} className={styles.requestItem}>
+                <p>Medication: {request.medication.name}</p>
+                <p>Quantity: {request.quantity}</p>
+                <p>Status: {request.status}</p>
+                <p>
+                  Requested At:{' '}
+                  {new Date(request.requested_at).toLocaleString('en-US', {
+                    year: 'numeric',
+                    month: 'long',
+                    day: 'numeric',
+                    hour: '2-digit',
+                    minute: '2-digit',
+                    second: '2-digit',
+                    hour12: true,
+                  })}
+                </p>
+              </li>
+            ))}
+          </ul>
+          {nextCursor && (
+            <button
+              type="button"
+              className={styles.loadMore}
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
+        </>
       ) : (
         <p>No refill requests found.</p>
       )}
@@ -1,5 +1,11 @@
 import { MEDICATION_ENDPOINTS } from '../constants/api';
 
+// URLs of the resized WebP derivatives of a medication image, by size name
+export interface MedicationImageVariants {
+  thumbnail?: string;
+  medium?: string;
+}
+
 export interface Medication {
   id: number;
   name: string;
@@ -7,6 +13,7 @@ export interface Medication {
   quantity: number;
   instructions: string;
   image?: string | null;
+  image_variants?: MedicationImageVariants | null;
   added_by: string;
   created_at: string;
   updated_at: string;
@@ -28,8 +35,15 @@ export interface UpdateMedicationPayload {
   image?: File | null;
 }
 
-export const fetchMedications = async (): Promise<Response> => {
-  return fetch(MEDICATION_ENDPOINTS.LIST_CREATE, {
+// The list endpoint is paginated by cursor; pass the `next` cursor of the
+// previous page to fetch the one after it.
+export const fetchMedications = async (
+  cursor?: string | null,
+): Promise<Response> => {
+  const url = cursor
+    ? `${MEDICATION_ENDPOINTS.LIST_CREATE}?cursor=${encodeURIComponent(cursor)}`
+    : MEDICATION_ENDPOINTS.LIST_CREATE;
+  return fetch(url, {
     method: 'GET',
     headers: { 'Content-Type': 'application/json' },
     credentials: 'include',
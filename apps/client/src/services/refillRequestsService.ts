@@ -9,13 +9,30 @@ export interface RefillRequest {
   requested_at: string;
 }
 
-export const fetchRefillRequests = async (): Promise<Response> => {
-  return fetch(REFILL_REQUEST_ENDPOINTS.LIST_CREATE, {
+export interface RefillRequestFilters {
+  status?: string;
+}
+
+// The list endpoint is paginated by cursor; pass the `next` cursor of the
+// previous page, with the same filters, to fetch the one after it.
+export const fetchRefillRequests = async (
+  filters: RefillRequestFilters = {},
+  cursor?: string | null,
+): Promise<Response> => {
+  const params = new URLSearchParams();
+  if (filters.status) params.set('status', filters.status);
+  if (cursor) params.set('cursor', cursor);
+  const query = params.toString();
+  const url = query
+    ? `${REFILL_REQUEST_ENDPOINTS.LIST_CREATE}?${query}`
+    : REFILL_REQUEST_ENDPOINTS.LIST_CREATE;
+  return fetch(url, {
     method: 'GET',
     headers: { 'Content-Type': 'application/json' },
     credentials: 'include',
   });
 };
+
 export const fetchRefillRequestsAggregate = async (): Promise<Response> => {
   return fetch(REFILL_REQUEST_ENDPOINTS.AGGREGATE, {
     method: 'GET',
@@ -0,0 +1,32 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from app import metrics
+
+# Upper bounds, in seconds, of the pool wait time histogram buckets
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that records how long each checkout from the
+    connection pool waited and how many checkouts failed.
+    """
+
+    def get_new_connection(self, conn_params):
+        if not self.pool:
+            return super().get_new_connection(conn_params)
+
+        started = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        except Exception:
+            metrics.increment("db_pool_checkout_errors")
+            raise
+        finally:
+            metrics.observe(
+                "db_pool_wait_seconds",
+                time.perf_counter() - started,
+                POOL_WAIT_BUCKETS,
+            )
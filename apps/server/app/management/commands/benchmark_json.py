@@ -0,0 +1,64 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from app.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = "Compare the stock and fast JSON renderers on a synthetic medication list"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=5000, help="Number of medications per payload"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Number of renders to time"
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+        now = datetime.now(timezone.utc)
+
+        payload = {
+            "code": "S005",
+            "data": [
+                {
+                    "id": i,
+                    "name": f"Medication {i}",
+                    "dosage": "500mg",
+                    "quantity": i % 100,
+                    "instructions": "Take one tablet every 6 hours as needed.",
+                    "image": None,
+                    "added_by": 1,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(rows)
+            ],
+        }
+
+        if orjson is None:
+            self.stdout.write(
+                self.style.WARNING("orjson is not installed; timing the fallback path.")
+            )
+
+        results = {}
+        for name, renderer in (
+            ("stock", JSONRenderer()),
+            ("fast", FastJSONRenderer()),
+        ):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                renderer.render(payload)
+            results[name] = (time.perf_counter() - started) / repeat
+            self.stdout.write(
+                f"{name:>5}: {results[name] * 1000:.2f} ms per render of {rows} rows"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Speedup: {results['stock'] / results['fast']:.1f}x")
+        )
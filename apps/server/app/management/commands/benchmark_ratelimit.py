@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from app import throttling
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request overhead of the rate limiter"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=10000, help="Number of checks to time"
+        )
+        parser.add_argument(
+            "--clients", type=int, default=100, help="Number of distinct client IPs"
+        )
+
+    def handle(self, *args, **options):
+        total = options["requests"]
+        clients = options["clients"]
+        factory = RequestFactory()
+        requests = [
+            factory.get("/api/medication/", REMOTE_ADDR=f"10.0.{i // 256}.{i % 256}")
+            for i in range(clients)
+        ]
+
+        store = type(throttling.get_store()).__name__
+        self.stdout.write(
+            f"Store: {store} (cache alias {settings.RATE_LIMIT_CACHE_ALIAS!r})"
+        )
+
+        # A budget large enough that every check takes the "allowed" path
+        budget = {"benchmark": f"{total}/h"}
+        for algorithm in (throttling.TOKEN_BUCKET, throttling.SLIDING_LOG):
+            with override_settings(RATE_LIMITS=budget, RATE_LIMIT_ALGORITHM=algorithm):
+                started = time.perf_counter()
+                for i in range(total):
+                    throttling.hit("benchmark", "ip", requests[i % clients])
+                elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{algorithm:>12}: {elapsed / total * 1_000_000:.1f} µs per request "
+                f"({total / elapsed:,.0f} checks/s)"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete."))
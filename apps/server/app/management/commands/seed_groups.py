@@ -4,6 +4,7 @@ from django.core.management.base import BaseCommand
 
 from authentication.enums import UserPermissions
 from authentication.models import User
+from authentication.permission_cache import bump_permissions_version
 from medication.enums import MedicationPermissions, RefillRequestPermissions
 from medication.models import Medication, RefillRequest
 
@@ -86,6 +87,9 @@ class Command(BaseCommand):
                         self.style.ERROR(f"Content type for {model_key} not found")
                     )
 
+        # Group permissions may have changed, so drop every cached permission set
+        bump_permissions_version()
+
         self.stdout.write(
             self.style.SUCCESS("All groups and permissions have been seeded.")
         )
@@ -0,0 +1,173 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse
+from django.utils._os import safe_join
+from django.utils.encoding import filepath_to_uri
+from rest_framework.status import (
+    HTTP_206_PARTIAL_CONTENT,
+    HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+)
+
+from .utils import conditional_response, make_etag, set_validators
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRange:
+    """
+    File-like view of ``length`` bytes of ``file`` starting at ``start``.
+    It has no ``fileno``, so WSGI servers read it instead of sending the
+    whole file with ``sendfile``.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def media_base_url(request=None):
+    """
+    Return the prefix of every media URL: ``MEDIA_BASE_URL`` when a CDN or
+    other origin is configured, otherwise ``MEDIA_URL`` made absolute for
+    ``request``. Resolve it once per request and pass it to ``media_url``.
+    """
+    if settings.MEDIA_BASE_URL:
+        return settings.MEDIA_BASE_URL.rstrip("/") + "/"
+    if request is None:
+        return settings.MEDIA_URL
+    return request.build_absolute_uri(settings.MEDIA_URL)
+
+
+def media_url(base_url, name):
+    """
+    Build the URL of the media file ``name`` without going through storage.
+    """
+    return base_url + filepath_to_uri(name)
+
+
+def media_path(name, directory=""):
+    """
+    Return the absolute path of the media file ``name``, or None when it
+    does not exist or resolves, through ``..`` or symlinks, outside the
+    ``directory`` of ``MEDIA_ROOT`` it must be served from.
+    """
+    root = os.path.realpath(os.path.join(settings.MEDIA_ROOT, directory))
+    try:
+        path = os.path.realpath(safe_join(settings.MEDIA_ROOT, name))
+    except SuspiciousFileOperation:
+        return None
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def parse_range(header, size):
+    """
+    Return the ``(start, end)`` byte positions of a single-range ``Range``
+    header, ``None`` when the header should be ignored and the whole file
+    sent, or ``False`` when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if match is None or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # A suffix range such as bytes=-500 asks for the last 500 bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end and last:
+            return None
+    if start >= size or size == 0:
+        return False
+    return start, end
+
+
+def media_response(request, name, directory="", immutable=False):
+    """
+    Serve the media file ``name`` after the caller has checked permissions,
+    or return None when it does not exist or lies outside ``directory``.
+
+    With ``MEDIA_SENDFILE_BACKEND`` set the response is empty and the front
+    proxy sends the bytes (X-Accel-Redirect for nginx, X-Sendfile for
+    Apache). Otherwise the file is returned as a ``FileResponse`` honouring
+    single byte ranges. ``immutable`` marks content-addressed files that may
+    be cached without revalidation.
+    """
+    path = media_path(name, directory)
+    if path is None:
+        return None
+    # The proxy is handed the resolved name, never the requested one
+    name = os.path.relpath(path, os.path.realpath(settings.MEDIA_ROOT))
+
+    stat = os.stat(path)
+    etag = make_etag(name, stat.st_size, stat.st_mtime_ns)
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    response = conditional_response(request, etag, last_modified)
+    if response is None:
+        backend = settings.MEDIA_SENDFILE_BACKEND
+        if backend == "nginx":
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = (
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(name)
+            )
+        elif backend == "apache":
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = path
+        else:
+            response = file_response(request, path, stat.st_size, etag, content_type)
+
+    set_validators(response, etag, last_modified)
+    if immutable:
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
+def file_response(request, path, size, etag, content_type):
+    byte_range = None
+    header = request.headers.get("Range")
+    # A stale If-Range validator means the client must get the whole file
+    if header and request.headers.get("If-Range", etag) == etag:
+        byte_range = parse_range(header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    file = open(path, "rb")
+    if byte_range is None:
+        # A real file lets the WSGI server send it with sendfile
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            FileRange(file, start, length),
+            content_type=content_type,
+            status=HTTP_206_PARTIAL_CONTENT,
+        )
+        response["Content-Length"] = length
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
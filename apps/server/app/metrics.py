@@ -0,0 +1,73 @@
+import os
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+_histograms = {}
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, value, buckets):
+    """
+    Record ``value`` in the histogram ``name``, counting it in the first
+    bucket whose upper bound is at least ``value``.
+    """
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = {
+                "buckets": dict.fromkeys([*map(str, buckets), "+Inf"], 0),
+                "count": 0,
+                "sum": 0.0,
+            }
+        bucket = next((str(b) for b in buckets if value <= b), "+Inf")
+        histogram["buckets"][bucket] += 1
+        histogram["count"] += 1
+        histogram["sum"] += value
+
+
+def pool_stats():
+    """
+    Return the psycopg pool statistics of every database alias whose pool has
+    been created in this worker process.
+    """
+    from django.db.backends.postgresql.base import DatabaseWrapper
+
+    stats = {}
+    for alias, pool in list(DatabaseWrapper._connection_pools.items()):
+        pool_stats = pool.get_stats()
+        pool_stats["in_use"] = pool_stats.get("pool_size", 0) - pool_stats.get(
+            "pool_available", 0
+        )
+        stats[alias] = pool_stats
+    return stats
+
+
+def snapshot():
+    """
+    Return the counters, histograms and database pool statistics collected
+    by this worker process.
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {
+            name: {**histogram, "buckets": dict(histogram["buckets"])}
+            for name, histogram in _histograms.items()
+        }
+    return {
+        "pid": os.getpid(),
+        "counters": counters,
+        "histograms": histograms,
+        "database_pools": pool_stats(),
+    }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
@@ -0,0 +1,120 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a ``(timestamp, id)`` keyset.
+
+    Pages are fetched with ``WHERE (field, id) > (last_field, last_id) LIMIT n``
+    so every page costs the same regardless of how deep into the table it is.
+    Cursors are opaque, url-safe tokens; clients only echo back the ``next`` or
+    ``prev`` values returned with the previous page.
+    """
+
+    def __init__(self, ordering_field, page_size=None, max_page_size=None):
+        self.ordering_field = ordering_field
+        self.page_size = page_size or settings.PAGINATION_PAGE_SIZE
+        self.max_page_size = max_page_size or settings.PAGINATION_MAX_PAGE_SIZE
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get("page_size", self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate(self, queryset, request):
+        """
+        Return ``(rows, pagination)`` for the page selected by the request's
+        ``cursor`` query parameter. Raises ``InvalidCursor`` for tampered or
+        malformed cursors.
+        """
+        queryset, page_size, direction, position = self._page_query(queryset, request)
+        rows = list(queryset[: page_size + 1])
+        return self._paginate_rows(rows, page_size, direction, position)
+
+    async def apaginate(self, queryset, request):
+        """
+        Async version of ``paginate()`` for views using the async ORM.
+        """
+        queryset, page_size, direction, position = self._page_query(queryset, request)
+        rows = [row async for row in queryset[: page_size + 1]]
+        return self._paginate_rows(rows, page_size, direction, position)
+
+    def _page_query(self, queryset, request):
+        page_size = self.get_page_size(request)
+        direction, position = self.decode_cursor(request.query_params.get("cursor"))
+
+        field = self.ordering_field
+        if direction == "next":
+            if position is not None:
+                queryset = queryset.filter(self._after(*position))
+            queryset = queryset.order_by(field, "id")
+        else:
+            queryset = queryset.filter(self._before(*position))
+            queryset = queryset.order_by(f"-{field}", "-id")
+        return queryset, page_size, direction, position
+
+    def _paginate_rows(self, rows, page_size, direction, position):
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if direction == "prev":
+            rows.reverse()
+
+        has_next = has_more if direction == "next" else True
+        has_prev = position is not None if direction == "next" else has_more
+
+        pagination = {
+            "next": self.encode_cursor("next", rows[-1]) if rows and has_next else None,
+            "prev": self.encode_cursor("prev", rows[0]) if rows and has_prev else None,
+        }
+        return rows, pagination
+
+    def _after(self, value, pk):
+        # The leading range predicate lets Postgres seek the composite index.
+        field = self.ordering_field
+        return Q(**{f"{field}__gte": value}) & (
+            Q(**{f"{field}__gt": value}) | Q(id__gt=pk)
+        )
+
+    def _before(self, value, pk):
+        field = self.ordering_field
+        return Q(**{f"{field}__lte": value}) & (
+            Q(**{f"{field}__lt": value}) | Q(id__lt=pk)
+        )
+
+    def encode_cursor(self, direction, row):
+        payload = {
+            "d": direction,
+            "p": [getattr(row, self.ordering_field).isoformat(), row.pk],
+        }
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return "next", None
+
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            direction = payload["d"]
+            value, pk = payload["p"]
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+
+        if direction not in ("next", "prev") or value is None:
+            raise InvalidCursor(cursor)
+        return direction, (value, pk)
@@ -0,0 +1,7 @@
+from rest_framework.permissions import BasePermission
+
+
+class HasMetricsPermission(BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        return request.method == "GET" and getattr(user, "role", None) == "ADMIN"
@@ -20,8 +20,6 @@ CSRF_COOKIE_SECURE = True
 CSRF_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = True
 
-RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "False") == "True"
-
 # Application definition
 ###############################################
 INSTALLED_APPS = [
@@ -48,21 +46,35 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "app.urls"
 WSGI_APPLICATION = "app.wsgi.application"
+ASGI_APPLICATION = "app.asgi.application"
+
+# "wsgi" or "asgi"; under ASGI the medication endpoints use async views
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+ASYNC_VIEWS = SERVER_MODE == "asgi"
 
 # Database configuration
 ###############################################
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "app.db",
         "NAME": os.getenv("DATABASE_NAME"),
         "USER": os.getenv("DATABASE_USERNAME"),
         "PASSWORD": os.getenv("DATABASE_PASSWORD"),
         "HOST": os.getenv("DATABASE_HOST"),
         "PORT": os.getenv("DATABASE_PORT_NUMBER"),
-        "OPTIONS": {"pool": True},
+        # Pool sizes are per worker process; size them against gunicorn workers.
+        # Blank values, as copied from .env.example, fall back to the defaults
+        "OPTIONS": {
+            "pool": {
+                "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE") or "4"),
+                "max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE") or "4"),
+                "timeout": float(os.getenv("DATABASE_POOL_TIMEOUT") or "30"),
+                "max_idle": float(os.getenv("DATABASE_POOL_MAX_IDLE") or "600"),
+            }
+        },
     },
     "test": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "app.db",
         "NAME": os.getenv("TEST_DATABASE_NAME"),
         "USER": os.getenv("TEST_DATABASE_USERNAME"),
         "PASSWORD": os.getenv("TEST_DATABASE_PASSWORD"),
@@ -72,16 +84,94 @@ DATABASES = {
 }
 
 # Use test database configuration when running tests
-if "test" in sys.argv or "test_coverage" in sys.argv:
+TESTING = "test" in sys.argv or "test_coverage" in sys.argv
+if TESTING:
     DATABASES["default"] = DATABASES["test"]
 
+# Cache configuration
+###############################################
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Rate limit budgets, sessions and cached users must be shared by every
+# worker and node, so they live in Redis. The in-process stand-in is only used
+# when no Redis is configured, i.e. in tests and local development.
+SHARED_CACHE = (
+    {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "OPTIONS": {
+            "socket_connect_timeout": 1,
+            "socket_timeout": 1,
+        },
+    }
+    if REDIS_URL and not TESTING
+    else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "ratelimit": {**SHARED_CACHE, "KEY_PREFIX": "ratelimit"},
+    "sessions": {**SHARED_CACHE, "KEY_PREFIX": "sessions"},
+    "permissions": {**SHARED_CACHE, "KEY_PREFIX": "permissions"},
+    "medication": {**SHARED_CACHE, "KEY_PREFIX": "medication"},
+}
+
+# Rate limiting
+###############################################
+RATE_LIMIT_ENABLED = (os.getenv("RATE_LIMIT_ENABLED") or "True") == "True"
+if TESTING:
+    # Tests exercise the views far faster than any budget allows
+    RATE_LIMIT_ENABLED = False
+RATE_LIMIT_CACHE_ALIAS = os.getenv("RATE_LIMIT_CACHE_ALIAS") or "ratelimit"
+# "token_bucket" smooths bursts, "sliding_log" enforces an exact window
+RATE_LIMIT_ALGORITHM = os.getenv("RATE_LIMIT_ALGORITHM") or "token_bucket"
+# Number of proxies appending to X-Forwarded-For in front of the application
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES") or "0")
+RATE_LIMITS = {
+    "login": os.getenv("RATE_LIMIT_LOGIN") or "5/30s",
+    "register": os.getenv("RATE_LIMIT_REGISTER") or "5/30s",
+    "medication_read": os.getenv("RATE_LIMIT_MEDICATION_READ") or "10/m",
+    "medication_write": os.getenv("RATE_LIMIT_MEDICATION_WRITE") or "5/m",
+    "refill_write": os.getenv("RATE_LIMIT_REFILL_WRITE") or "5/m",
+    "medication_import": os.getenv("RATE_LIMIT_MEDICATION_IMPORT") or "10/h",
+}
+
 # Authentication settings
 ###############################################
 AUTH_USER_MODEL = "authentication.User"
 AUTHENTICATION_BACKENDS = [
-    "django.contrib.auth.backends.ModelBackend",
+    "authentication.backends.CachedPermissionBackend",
 ]
 
+# Resolved permission sets are cached per user and invalidated on group changes.
+# An invalidation must reach every worker, or a demoted user keeps their old
+# rights elsewhere, so permissions are only cached across requests with Redis.
+PERMISSION_CACHE_ALIAS = os.getenv("PERMISSION_CACHE_ALIAS") or "permissions"
+if REDIS_URL or TESTING:
+    PERMISSION_CACHE_TIMEOUT = int(os.getenv("PERMISSION_CACHE_TIMEOUT") or "300")
+else:
+    PERMISSION_CACHE_TIMEOUT = 0
+
+# Sessions and the users they belong to are read through the shared cache.
+# Without Redis every worker would keep its own copy and miss logouts made in
+# other workers, so plain database sessions and no user cache are used then.
+SESSION_CACHE_ALIAS = "sessions"
+USER_CACHE_ALIAS = "sessions"
+if REDIS_URL or TESTING:
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+    USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT") or "60")
+else:
+    SESSION_ENGINE = "django.contrib.sessions.backends.db"
+    USER_CACHE_TIMEOUT = 0
+
+# Expired session sweeps (purge_sessions)
+SESSION_PURGE_BATCH_SIZE = int(os.getenv("SESSION_PURGE_BATCH_SIZE") or "1000")
+SESSION_PURGE_SLEEP = float(os.getenv("SESSION_PURGE_SLEEP") or "0.1")
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"
@@ -97,15 +187,80 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "app.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "app.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "EXCEPTION_HANDLER": "app.utils.exception_handler",
 }
 
+# Cursor pagination for list endpoints
+PAGINATION_PAGE_SIZE = int(os.getenv("PAGINATION_PAGE_SIZE") or "50")
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv("PAGINATION_MAX_PAGE_SIZE") or "200")
+
+# Rows serialized per chunk when streaming list responses
+STREAMING_CHUNK_SIZE = int(os.getenv("STREAMING_CHUNK_SIZE") or "500")
+
+# Medication catalog response cache ("lru", "shared" or "none"). The catalog
+# version always lives in the shared cache so that writes from any worker or
+# management command invalidate every worker's payloads; without Redis there
+# is no such cache and payloads are not cached by default.
+MEDICATION_CACHE_BACKEND = os.getenv("MEDICATION_CACHE_BACKEND") or (
+    "lru" if REDIS_URL else "none"
+)
+if TESTING:
+    # The database is rolled back between tests but cached payloads are not
+    MEDICATION_CACHE_BACKEND = "none"
+MEDICATION_CACHE_ALIAS = os.getenv("MEDICATION_CACHE_ALIAS") or "medication"
+MEDICATION_CACHE_TIMEOUT = int(os.getenv("MEDICATION_CACHE_TIMEOUT") or "300")
+MEDICATION_CACHE_MAX_ENTRIES = int(os.getenv("MEDICATION_CACHE_MAX_ENTRIES") or "1024")
+
+# Resized WebP derivatives of medication images, by size name and longest edge
+MEDICATION_IMAGE_SIZES = {
+    "thumbnail": int(os.getenv("MEDICATION_IMAGE_THUMBNAIL_SIZE") or "160"),
+    "medium": int(os.getenv("MEDICATION_IMAGE_MEDIUM_SIZE") or "640"),
+}
+MEDICATION_IMAGE_QUALITY = int(os.getenv("MEDICATION_IMAGE_QUALITY") or "80")
+# Retries and polling of the run_image_worker queue
+MEDICATION_IMAGE_JOB_MAX_ATTEMPTS = int(
+    os.getenv("MEDICATION_IMAGE_JOB_MAX_ATTEMPTS") or "5"
+)
+MEDICATION_IMAGE_JOB_RETRY_DELAY = int(
+    os.getenv("MEDICATION_IMAGE_JOB_RETRY_DELAY") or "30"
+)
+MEDICATION_IMAGE_WORKER_POLL_INTERVAL = float(
+    os.getenv("MEDICATION_IMAGE_WORKER_POLL_INTERVAL") or "2"
+)
+
+# Bulk medication imports
+MEDICATION_IMPORT_BATCH_SIZE = int(os.getenv("MEDICATION_IMPORT_BATCH_SIZE") or "1000")
+MEDICATION_IMPORT_MAX_ERRORS = int(os.getenv("MEDICATION_IMPORT_MAX_ERRORS") or "1000")
+
+# Refill analytics rollups
+REFILL_ROLLUP_OVERLAP_SECONDS = int(os.getenv("REFILL_ROLLUP_OVERLAP_SECONDS") or "300")
+REFILL_ROLLUP_BATCH_SIZE = int(os.getenv("REFILL_ROLLUP_BATCH_SIZE") or "1000")
+REFILL_ANALYTICS_MAX_ROWS = int(os.getenv("REFILL_ANALYTICS_MAX_ROWS") or "5000")
+
 # Static and media files
 ###############################################
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Origin that media URLs are built from, e.g. a CDN; empty uses the request host
+MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL", "")
+# Media is served by a permission-checked view. "nginx" (X-Accel-Redirect) or
+# "apache" (X-Sendfile) hands the transfer to the front proxy; empty streams
+# the file from Django
+MEDIA_SENDFILE_BACKEND = os.getenv("MEDIA_SENDFILE_BACKEND", "")
+MEDIA_ACCEL_REDIRECT_PREFIX = (
+    os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX") or "/protected-media/"
+)
 
 # Localization settings
 ###############################################
@@ -0,0 +1,65 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from rest_framework.status import HTTP_200_OK
+
+from .renderers import FastJSONRenderer
+
+
+def wants_stream(request):
+    return request.query_params.get("stream", "").lower() in ("1", "true")
+
+
+def iterate_rows(queryset):
+    """
+    Yield rows through a server-side cursor. The transaction keeps Postgres
+    from materialising the whole result set as it would for a WITH HOLD
+    cursor in autocommit mode.
+    """
+    with transaction.atomic():
+        yield from queryset.iterator(chunk_size=settings.STREAMING_CHUNK_SIZE)
+
+
+def stream_json_response(code, queryset, serialize, status_code=HTTP_200_OK):
+    """
+    Stream ``{"code": code, "data": [...]}`` while iterating ``queryset`` with
+    a server-side cursor. ``serialize`` turns a list of rows into a list of
+    JSON-ready items; only one chunk of rows is held in memory at a time.
+    """
+    chunk_size = settings.STREAMING_CHUNK_SIZE
+    renderer = FastJSONRenderer()
+
+    def generate():
+        yield b'{"code":' + renderer.render(code) + b',"data":['
+        rows = iterate_rows(queryset)
+        separator = b""
+        while chunk := list(islice(rows, chunk_size)):
+            # Render the chunk as a list and splice its items into the envelope
+            yield separator + renderer.render(serialize(chunk))[1:-1]
+            separator = b","
+        yield b"]}"
+
+    return StreamingHttpResponse(
+        generate(), content_type="application/json", status=status_code
+    )
+
+
+def to_async_stream(response):
+    """
+    Serve a streaming response's synchronous content from an async view one
+    chunk at a time. ASGI would otherwise buffer the whole body before
+    sending it. Chunks are produced in the request's sync thread so the
+    cursor transaction stays on one connection.
+    """
+    if getattr(response, "streaming", False) and not response.is_async:
+        response.streaming_content = _aiterate(response.streaming_content)
+    return response
+
+
+async def _aiterate(iterator):
+    done = object()
+    while (chunk := await sync_to_async(next)(iterator, done)) is not done:
+        yield chunk
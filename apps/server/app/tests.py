@@ -0,0 +1,169 @@
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from . import metrics, renderers, throttling
+from .media import parse_range
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def setUp(self):
+        self.data = {
+            "code": "S005",
+            "data": [
+                {
+                    "id": 1,
+                    "name": "Paracétamol\u2028",
+                    "created_at": datetime(
+                        2024, 1, 2, 3, 4, 5, 678, tzinfo=timezone.utc
+                    ),
+                    "price": Decimal("1.50"),
+                    "delay": timedelta(hours=1),
+                    "label": gettext_lazy("Pending"),
+                    "counts": {1: 2},
+                }
+            ],
+        }
+
+    def test_matches_stock_renderer(self):
+        """
+        Test that the fast renderer produces the same JSON as DRF's renderer
+        """
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(self.data)),
+            json.loads(JSONRenderer().render(self.data)),
+        )
+
+    def test_escapes_javascript_line_separators(self):
+        """
+        Test that U+2028 is escaped like DRF's renderer does
+        """
+        self.assertIn(b"\\u2028", FastJSONRenderer().render(self.data))
+
+    def test_renders_none_as_empty_body(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_falls_back_without_orjson(self):
+        """
+        Test the pure-Python fallback when orjson is not installed
+        """
+        with patch.object(renderers, "orjson", None):
+            rendered = FastJSONRenderer().render(self.data)
+
+        self.assertEqual(rendered, JSONRenderer().render(self.data))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def test_parses_utf8_body(self):
+        stream = io.BytesIO('{"name": "Paracétamol", "quantity": 2}'.encode())
+
+        self.assertEqual(
+            FastJSONParser().parse(stream),
+            {"name": "Paracétamol", "quantity": 2},
+        )
+
+    def test_rejects_malformed_body(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b"{not json"))
+
+
+@override_settings(RATE_LIMITS={"test": "2/m"}, RATE_LIMIT_TRUSTED_PROXIES=0)
+class ThrottlingTests(SimpleTestCase):
+    def setUp(self):
+        caches[settings.RATE_LIMIT_CACHE_ALIAS].clear()
+        self.request = RequestFactory().get("/api/medication/", REMOTE_ADDR="10.0.0.1")
+
+    def test_parse_rate(self):
+        self.assertEqual(throttling.parse_rate("10/m"), (10, 60))
+        self.assertEqual(throttling.parse_rate("5/30s"), (5, 30))
+        with self.assertRaises(throttling.InvalidRate):
+            throttling.parse_rate("five per minute")
+
+    @override_settings(RATE_LIMIT_ALGORITHM=throttling.TOKEN_BUCKET)
+    def test_token_bucket_rejects_once_budget_is_spent(self):
+        self.assertEqual(throttling.hit("test", "ip", self.request), 0)
+        self.assertEqual(throttling.hit("test", "ip", self.request), 0)
+
+        retry_after = throttling.hit("test", "ip", self.request)
+        self.assertAlmostEqual(retry_after, 30, delta=1)
+
+    @override_settings(RATE_LIMIT_ALGORITHM=throttling.SLIDING_LOG)
+    def test_sliding_log_rejects_until_oldest_request_expires(self):
+        self.assertEqual(throttling.hit("test", "ip", self.request), 0)
+        self.assertEqual(throttling.hit("test", "ip", self.request), 0)
+
+        retry_after = throttling.hit("test", "ip", self.request)
+        self.assertAlmostEqual(retry_after, 60, delta=1)
+
+    def test_budgets_are_partitioned_by_key(self):
+        other = RequestFactory().get("/api/medication/", REMOTE_ADDR="10.0.0.2")
+        throttling.hit("test", "ip", self.request)
+        throttling.hit("test", "ip", self.request)
+
+        self.assertTrue(throttling.hit("test", "ip", self.request))
+        self.assertEqual(throttling.hit("test", "ip", other), 0)
+
+    @override_settings(RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_client_ip_skips_trusted_proxies(self):
+        request = RequestFactory().get(
+            "/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="1.2.3.4, 5.6.7.8"
+        )
+        self.assertEqual(throttling.client_ip(request), "5.6.7.8")
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_observe_counts_values_per_bucket(self):
+        for value in (0.002, 0.004, 0.3, 12):
+            metrics.observe("wait", value, (0.005, 0.5))
+
+        histogram = metrics.snapshot()["histograms"]["wait"]
+        self.assertEqual(histogram["buckets"], {"0.005": 2, "0.5": 1, "+Inf": 1})
+        self.assertEqual(histogram["count"], 4)
+        self.assertAlmostEqual(histogram["sum"], 12.306)
+
+    def test_snapshot_reports_database_pools(self):
+        pool = Mock()
+        pool.get_stats.return_value = {
+            "pool_size": 4,
+            "pool_available": 1,
+            "requests_waiting": 2,
+        }
+
+        with patch.dict(DatabaseWrapper._connection_pools, {"default": pool}):
+            pools = metrics.snapshot()["database_pools"]
+
+        self.assertEqual(pools["default"]["in_use"], 3)
+        self.assertEqual(pools["default"]["requests_waiting"], 2)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_single_ranges(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=500-5000", 1000), (500, 999))
+
+    def test_unsupported_ranges_are_ignored(self):
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 1000))
+        self.assertIsNone(parse_range("bytes=9-3", 1000))
+        self.assertIsNone(parse_range("items=0-1", 1000))
+
+    def test_unsatisfiable_ranges(self):
+        self.assertIs(parse_range("bytes=1000-", 1000), False)
+        self.assertIs(parse_range("bytes=-0", 1000), False)
@@ -0,0 +1,206 @@
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+from . import metrics
+
+RATE_PATTERN = re.compile(r"^(\d+)/(\d*)([smhd])$")
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+TOKEN_BUCKET = "token_bucket"
+SLIDING_LOG = "sliding_log"
+
+# Both scripts read the clock from Redis so every node shares one timeline.
+# Floats are returned as strings because Redis truncates Lua numbers.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local rate = capacity / period
+local state = redis.call("HMGET", KEYS[1], "tokens", "stamp")
+local tokens = tonumber(state[1]) or capacity
+local stamp = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - stamp) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "stamp", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil(period * 1000))
+return tostring(retry_after)
+"""
+
+SLIDING_LOG_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now - period)
+local retry_after = 0
+if redis.call("ZCARD", KEYS[1]) < limit then
+    redis.call("ZADD", KEYS[1], now, ARGV[3])
+else
+    local oldest = redis.call("ZRANGE", KEYS[1], 0, 0, "WITHSCORES")
+    retry_after = tonumber(oldest[2]) + period - now
+end
+redis.call("PEXPIRE", KEYS[1], math.ceil(period * 1000))
+return tostring(retry_after)
+"""
+
+
+class InvalidRate(ValueError):
+    pass
+
+
+def parse_rate(rate):
+    """
+    Parse ``"<limit>/<period>"`` rates such as ``"10/m"`` or ``"5/30s"`` into
+    ``(limit, period_in_seconds)``.
+    """
+    match = RATE_PATTERN.match(rate or "")
+    if match is None:
+        raise InvalidRate(rate)
+    limit, multiplier, unit = match.groups()
+    return int(limit), int(multiplier or 1) * UNITS[unit]
+
+
+class RedisStore:
+    """
+    Limiter state kept in Redis and updated by a single Lua script per check,
+    so concurrent workers and nodes never race on a budget.
+    """
+
+    scripts = {TOKEN_BUCKET: TOKEN_BUCKET_SCRIPT, SLIDING_LOG: SLIDING_LOG_SCRIPT}
+    shas = {
+        algorithm: hashlib.sha1(script.encode()).hexdigest()
+        for algorithm, script in scripts.items()
+    }
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def hit(self, algorithm, key, limit, period):
+        from redis.exceptions import NoScriptError, RedisError
+
+        key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(key, write=True)
+        args = (limit, period, os.urandom(8).hex())
+        try:
+            try:
+                retry_after = client.evalsha(self.shas[algorithm], 1, key, *args)
+            except NoScriptError:
+                retry_after = client.eval(self.scripts[algorithm], 1, key, *args)
+        except RedisError:
+            # An unreachable store must not take the API down with it
+            metrics.increment("ratelimit_store_errors")
+            return 0
+        return float(retry_after)
+
+
+class CacheStore:
+    """
+    Limiter state kept in any Django cache. Updates are serialised by a
+    process-local lock, which is only sound for per-process caches such as
+    LocMem; use Redis whenever more than one worker serves traffic.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def hit(self, algorithm, key, limit, period):
+        now = time.time()
+        with self.lock:
+            if algorithm == TOKEN_BUCKET:
+                return self._token_bucket(key, limit, period, now)
+            return self._sliding_log(key, limit, period, now)
+
+    def _token_bucket(self, key, capacity, period, now):
+        rate = capacity / period
+        tokens, stamp = self.cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0, now - stamp) * rate)
+        retry_after = 0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+        self.cache.set(key, (tokens, now), timeout=math.ceil(period))
+        return retry_after
+
+    def _sliding_log(self, key, limit, period, now):
+        log = [stamp for stamp in self.cache.get(key, ()) if stamp > now - period]
+        retry_after = 0
+        if len(log) < limit:
+            log.append(now)
+        else:
+            retry_after = log[0] + period - now
+        self.cache.set(key, log, timeout=math.ceil(period))
+        return retry_after
+
+
+def get_store():
+    cache = caches[settings.RATE_LIMIT_CACHE_ALIAS]
+    if isinstance(cache, RedisCache):
+        return RedisStore(cache)
+    return CacheStore(cache)
+
+
+def client_ip(request):
+    """
+    Return the address of the client, skipping the trusted proxies in front
+    of the application that appended themselves to ``X-Forwarded-For``.
+    """
+    proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if proxies:
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+        forwarded = [address.strip() for address in forwarded if address.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _user_key(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{client_ip(request)}"
+
+
+def _route_key(request):
+    match = request.resolver_match
+    return f"route:{match.route if match else request.path}"
+
+
+KEYS = {
+    "ip": lambda request: f"ip:{client_ip(request)}",
+    "user": _user_key,
+    "route": _route_key,
+}
+
+
+def hit(scope, key, request):
+    """
+    Spend one request from the budget configured for ``scope`` in
+    ``settings.RATE_LIMITS``, partitioned by ``key`` ("ip", "user" or
+    "route"). Returns 0 when the request is allowed, otherwise the number of
+    seconds until it would be.
+    """
+    limit, period = parse_rate(settings.RATE_LIMITS[scope])
+    algorithm = settings.RATE_LIMIT_ALGORITHM
+    cache_key = f"rl:{algorithm}:{scope}:{KEYS[key](request)}"
+
+    retry_after = get_store().hit(algorithm, cache_key, limit, period)
+    if retry_after:
+        metrics.increment("ratelimit_rejections")
+    return retry_after
@@ -1,7 +1,10 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import include, path
 
+from medication.views import MedicationMediaApiView
+
+from .views import MetricsApiView
+
 urlpatterns = [
     path(
         "api/",
@@ -9,10 +12,13 @@ urlpatterns = [
             [
                 path("auth/", include("authentication.urls")),
                 path("medication/", include("medication.urls")),
+                path("internal/metrics/", MetricsApiView.as_view(), name="metrics"),
             ]
         ),
-    )
+    ),
+    path(
+        f"{settings.MEDIA_URL.strip('/')}/medications/<path:path>",
+        MedicationMediaApiView.as_view(),
+        name="medication-media",
+    ),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,16 +1,57 @@
+import hashlib
+import math
 from functools import wraps
 
-import django_ratelimit.decorators
 import rest_framework.views
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views import View
 from rest_framework.response import Response
-from rest_framework.status import HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
+from rest_framework.status import (
+    HTTP_401_UNAUTHORIZED,
+    HTTP_403_FORBIDDEN,
+    HTTP_429_TOO_MANY_REQUESTS,
+)
 
+from . import throttling
 from .response_codes import RESPONSE_CODES
 
 
-def json_response(code=None, data=None, status_code=200):
-    return Response({"code": code, "data": data}, status=status_code)
+def json_response(code=None, data=None, status_code=200, pagination=None):
+    body = {"code": code, "data": data}
+    if pagination is not None:
+        body.update(pagination)
+    return Response(body, status=status_code)
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the values that determine a representation.
+    """
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def conditional_response(request, etag, last_modified=None):
+    """
+    Return a 304/412 response when the request's preconditions are satisfied
+    by ``etag`` and ``last_modified`` (a UNIX timestamp), otherwise None.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Clients may keep the body but must revalidate it before every reuse
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 def exception_handler(exc, context):
@@ -31,21 +72,59 @@ def exception_handler(exc, context):
     return response
 
 
-def ratelimit(*args, **kwargs):
+def ratelimit(scope, key="ip", method=None):
     """
-    A decorator that applies ratelimit only when settings.DEBUG is False.
+    Limit a view to the budget configured for ``scope`` in
+    ``settings.RATE_LIMITS``. Requests over budget are answered with 429 and
+    a ``Retry-After`` header. ``method`` restricts limiting to one method or
+    a list of methods.
+
+    Async views and handlers are supported; async handlers are decorated
+    directly rather than through ``method_decorator``.
     """
+    methods = [method] if isinstance(method, str) else method
+
+    def limited_response(request):
+        if not settings.RATE_LIMIT_ENABLED or (
+            methods is not None and request.method not in methods
+        ):
+            return None
+
+        retry_after = throttling.hit(scope, key, request)
+        if not retry_after:
+            return None
+
+        response = json_response(
+            code=RESPONSE_CODES["TOO_MANY_REQUESTS"],
+            data=None,
+            status_code=HTTP_429_TOO_MANY_REQUESTS,
+        )
+        response["Retry-After"] = str(math.ceil(retry_after))
+        return response
 
     def decorator(view_func):
-        if settings.RATE_LIMIT_ENABLED:
-            # If in development, return the view function unmodified
+        if iscoroutinefunction(view_func):
+
             @wraps(view_func)
-            def _wrapped_view(*args, **kwargs):
-                return view_func(*args, **kwargs)
+            async def _async_wrapped_view(*args, **kwargs):
+                request = args[1] if isinstance(args[0], View) else args[0]
+                # The limiter store is blocking I/O; keep it off the event loop
+                response = await sync_to_async(
+                    limited_response, thread_sensitive=False
+                )(request)
+                if response is not None:
+                    return response
+                return await view_func(*args, **kwargs)
+
+            return _async_wrapped_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            response = limited_response(request)
+            if response is not None:
+                return response
+            return view_func(request, *args, **kwargs)
 
-            return _wrapped_view
-        else:
-            # In production, apply the ratelimit decorator
-            return django_ratelimit.decorators.ratelimit(*args, **kwargs)(view_func)
+        return _wrapped_view
 
     return decorator
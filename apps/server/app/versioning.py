@@ -0,0 +1,26 @@
+import time
+
+from django.core.cache import caches
+
+
+def get_version(alias, key):
+    """
+    Return the version counter stored under ``key`` in the cache ``alias``.
+    Cache entries include it in their keys, so bumping it invalidates them
+    all at once.
+    """
+    cache = caches[alias]
+    version = cache.get(key)
+    if version is None:
+        # Seed with a timestamp so a lost version never reuses old entries
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(alias, key):
+    cache = caches[alias]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
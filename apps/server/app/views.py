@@ -0,0 +1,23 @@
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.status import HTTP_200_OK
+from rest_framework.views import APIView
+
+from . import metrics
+from .permissions import HasMetricsPermission
+from .response_codes import RESPONSE_CODES
+from .utils import json_response
+
+
+class MetricsApiView(APIView):
+    permission_classes = [IsAuthenticated, HasMetricsPermission]
+
+    def get(self, request):
+        """
+        Return the internal counters, histograms and database pool statistics
+        of the worker serving the request.
+        """
+        return json_response(
+            code=RESPONSE_CODES["METRICS_SUCCESS"],
+            data=metrics.snapshot(),
+            status_code=HTTP_200_OK,
+        )
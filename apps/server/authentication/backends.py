@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from .permission_cache import cache_key
+from .user_cache import cache_user, get_cached_user
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    ModelBackend that keeps each user's resolved permission set in a shared
+    cache, so permission checks do not join through the group and permission
+    tables on every request. Session users are cached for a short time too,
+    so authenticated requests normally resolve without touching the database.
+    """
+
+    def get_user(self, user_id):
+        if not settings.USER_CACHE_TIMEOUT:
+            return super().get_user(user_id)
+
+        user = get_cached_user(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache_user(user)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if (
+            not settings.PERMISSION_CACHE_TIMEOUT
+            or not user_obj.is_active
+            or user_obj.is_anonymous
+            or obj is not None
+        ):
+            return super().get_all_permissions(user_obj, obj=obj)
+
+        if not hasattr(user_obj, "_perm_cache"):
+            cache = caches[settings.PERMISSION_CACHE_ALIAS]
+            key = cache_key(user_obj.pk)
+            permissions = cache.get(key)
+            if permissions is None:
+                permissions = super().get_all_permissions(user_obj)
+                cache.set(key, permissions, settings.PERMISSION_CACHE_TIMEOUT)
+            user_obj._perm_cache = permissions
+        return user_obj._perm_cache
@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in small batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.SESSION_PURGE_BATCH_SIZE,
+            help="Maximum number of sessions deleted per statement",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=settings.SESSION_PURGE_SLEEP,
+            help="Seconds to pause between batches",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and sweep again every N seconds",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pause = options["sleep"]
+        interval = options["interval"]
+
+        while True:
+            deleted, elapsed = self.purge(batch_size, pause)
+            rate = deleted / elapsed if elapsed else 0
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Deleted {deleted} expired sessions in {elapsed:.2f}s "
+                    f"({rate:,.0f} rows/s)."
+                )
+            )
+            if interval <= 0:
+                return
+            time.sleep(interval)
+
+    def purge(self, batch_size, pause):
+        """
+        Delete sessions that expired before the sweep started. Each batch is
+        its own short statement, so row locks are held only briefly and
+        concurrent logins are never blocked for long.
+        """
+        now = timezone.now()
+        started = time.perf_counter()
+        deleted = 0
+
+        while True:
+            batch = Session.objects.filter(expire_date__lt=now).values("pk")[
+                :batch_size
+            ]
+            count, _ = Session.objects.filter(pk__in=batch).delete()
+            deleted += count
+            if count < batch_size:
+                break
+            time.sleep(pause)
+
+        return deleted, time.perf_counter() - started
@@ -3,7 +3,24 @@ import re
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import Group, Permission, PermissionsMixin
 from django.core.validators import EmailValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from .user_cache import invalidate_cached_user
+
+# Role group ids resolved by this process. Only ids of committed groups are
+# cached so a rolled back get_or_create never leaves a dangling id behind.
+_role_group_ids = {}
+
+
+def get_role_group_id(group_name):
+    group_id = _role_group_ids.get(group_name)
+    if group_id is None:
+        group, _ = Group.objects.get_or_create(name=group_name)
+        group_id = group.id
+        transaction.on_commit(lambda: _role_group_ids.setdefault(group_name, group_id))
+    return group_id
 
 
 class UserManager(BaseUserManager):
@@ -28,6 +45,37 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def record_failed_login(self, pk):
+        """
+        Count a failed login and lock the account once the limit is reached.
+
+        Both columns are written by one UPDATE evaluated against the current
+        row, so concurrent failures can neither lose increments nor skip the
+        lockout.
+        """
+        limit = self.model.MAX_FAILED_LOGIN_ATTEMPTS
+        updated = self.filter(pk=pk).update(
+            failed_login_attempts=F("failed_login_attempts") + 1,
+            is_locked=Case(
+                When(failed_login_attempts__gte=limit - 1, then=True),
+                default=F("is_locked"),
+            ),
+            updated_at=timezone.now(),
+        )
+        invalidate_cached_user(pk)
+        return updated
+
+    def reset_failed_logins(self, pk):
+        """
+        Clear the failed login counter, skipping the write when already clear.
+        """
+        updated = self.filter(pk=pk, failed_login_attempts__gt=0).update(
+            failed_login_attempts=0, updated_at=timezone.now()
+        )
+        if updated:
+            invalidate_cached_user(pk)
+        return updated
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     class Role(models.TextChoices):
@@ -45,6 +93,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    MAX_FAILED_LOGIN_ATTEMPTS = 5
+
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email", "role"]
 
@@ -64,17 +114,38 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.username
 
+    ROLE_GROUPS = {
+        Role.USER: "Users",
+        Role.ADMIN: "Admins",
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Role the stored group membership reflects; None when deferred
+        self._synced_role = self.__dict__.get("role")
+
     def save(self, *args, **kwargs):
+        created = self._state.adding
+        role_changed = created or self.role != self._synced_role
         super().save(*args, **kwargs)
+        invalidate_cached_user(self.pk)
 
-        # Define a mapping from roles to groups
-        role_group_map = {
-            self.Role.USER: "Users",
-            self.Role.ADMIN: "Admins",
-        }
+        if role_changed:
+            self.sync_role_group(created)
 
-        # Get or create the group based on the user's role
-        group_name = role_group_map.get(self.role)
+    def sync_role_group(self, created=False):
+        """
+        Move the user into the group matching their role.
+        """
+        if not created:
+            stale_groups = [
+                name for role, name in self.ROLE_GROUPS.items() if role != self.role
+            ]
+            self.groups.remove(*self.groups.filter(name__in=stale_groups))
+
+        group_name = self.ROLE_GROUPS.get(self.role)
         if group_name:
-            group, _ = Group.objects.get_or_create(name=group_name)
-            self.groups.add(group)
+            self.groups.add(get_role_group_id(group_name))
+
+        # The membership changes above invalidate the cached permission set
+        self._synced_role = self.role
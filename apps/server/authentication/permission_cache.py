@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from app.versioning import bump_version, get_version
+
+VERSION_KEY = "permissions:version"
+
+
+def get_permissions_version():
+    return get_version(settings.PERMISSION_CACHE_ALIAS, VERSION_KEY)
+
+
+def bump_permissions_version():
+    """
+    Invalidate every cached permission set, e.g. after group permissions change.
+    """
+    bump_version(settings.PERMISSION_CACHE_ALIAS, VERSION_KEY)
+
+
+def invalidate_user_permissions(user_id):
+    """
+    Invalidate the cached permission set of a single user, e.g. after their
+    group membership changes. Inside a transaction the entry is dropped once
+    it commits; dropping it earlier would let a concurrent request cache the
+    old permissions again from the not yet updated rows.
+    """
+    transaction.on_commit(
+        lambda: caches[settings.PERMISSION_CACHE_ALIAS].delete(cache_key(user_id))
+    )
+
+
+def cache_key(user_id):
+    return f"permissions:{get_permissions_version()}:{user_id}"
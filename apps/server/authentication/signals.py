@@ -0,0 +1,25 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from .models import User
+from .permission_cache import bump_permissions_version, invalidate_user_permissions
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_member_permissions(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Drop the cached permission sets of users whose groups changed, whether
+    through ``user.groups`` or a group's ``user_groups``.
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        invalidate_user_permissions(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            invalidate_user_permissions(user_id)
+    else:
+        # A group was cleared of members that are no longer known here
+        bump_permissions_version()
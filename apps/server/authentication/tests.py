@@ -1,13 +1,22 @@
+from datetime import timedelta
+from io import StringIO
 from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
 from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from app.response_codes import RESPONSE_CODES
 
+from .models import _role_group_ids
 from .serializers import UserSerializer
 
 UserModel = get_user_model()
@@ -222,6 +231,53 @@ class LoginApiViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(response.json(), expected_response)
 
+    def test_failed_logins_are_counted_against_the_stored_value(self):
+        """
+        Test that failed logins increment the stored counter, not a stale copy
+        """
+        user = UserModel.objects.get(username=self.username)
+        UserModel.objects.filter(pk=user.pk).update(failed_login_attempts=4)
+
+        UserModel.objects.record_failed_login(user.pk)
+
+        user.refresh_from_db()
+        self.assertEqual(user.failed_login_attempts, 5)
+        self.assertTrue(user.is_locked)
+
+    def test_successful_login_resets_failed_attempts(self):
+        """
+        Test that a successful login clears earlier failed attempts
+        """
+        data = {"username": self.username, "password": "wrongpassword"}
+        self.client.post(self.url, data, format="json")
+
+        data["password"] = self.password
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user = UserModel.objects.get(username=self.username)
+        self.assertEqual(user.failed_login_attempts, 0)
+        self.assertFalse(user.is_locked)
+
+    @override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMITS={"login": "1/m"})
+    def test_login_is_rate_limited_with_retry_after(self):
+        """
+        Test that logins over budget are rejected with 429 and Retry-After
+        """
+        caches[settings.RATE_LIMIT_CACHE_ALIAS].clear()
+        data = {"username": self.username, "password": "wrongpassword"}
+        self.client.post(self.url, data, format="json")
+
+        response = self.client.post(self.url, data, format="json")
+
+        expected_response = {
+            "code": RESPONSE_CODES["TOO_MANY_REQUESTS"],
+            "data": None,
+        }
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.json(), expected_response)
+        self.assertEqual(response["Retry-After"], "60")
+
     def test_login_with_nonexistent_user(self):
         """
         Test login attempt with a username that does not exist
@@ -548,3 +604,242 @@ class UserInfoApiViewTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(response.json(), expected_response)
+
+
+class PermissionCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_groups", stdout=StringIO())
+        cls.user = UserModel.objects.create_user(
+            username="testuser",
+            password="testpassword",
+            email="test@gmail.com",
+            role=UserModel.Role.USER,
+        )
+
+    def setUp(self):
+        # The database is rolled back between tests but cached permissions are not
+        caches[settings.PERMISSION_CACHE_ALIAS].clear()
+
+    def test_permission_checks_are_cached_across_requests(self):
+        """
+        Test that a fresh user object resolves permissions without queries
+        """
+        UserModel.objects.get(pk=self.user.pk).has_perm("medication.view_medication")
+
+        user = UserModel.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm("medication.view_medication"))
+            self.assertFalse(user.has_perm("medication.add_medication"))
+
+    def test_role_change_invalidates_cached_permissions(self):
+        """
+        Test that saving a new role refreshes the cached permission set
+        """
+        user = UserModel.objects.get(pk=self.user.pk)
+        self.assertFalse(user.has_perm("medication.add_medication"))
+
+        # Committing also caches the role group's id, which is rolled back
+        self.addCleanup(_role_group_ids.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.role = UserModel.Role.ADMIN
+            user.save()
+
+        user = UserModel.objects.get(pk=self.user.pk)
+        self.assertTrue(user.has_perm("medication.add_medication"))
+
+    def test_invalidation_waits_for_commit(self):
+        """
+        Test that a cached permission set is only dropped once the group
+        change commits, so no request can cache it again from the old rows
+        """
+        UserModel.objects.get(pk=self.user.pk).has_perm("medication.add_medication")
+        admins = Group.objects.get(name="Admins")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(admins)
+            user = UserModel.objects.get(pk=self.user.pk)
+            self.assertFalse(user.has_perm("medication.add_medication"))
+
+        user = UserModel.objects.get(pk=self.user.pk)
+        self.assertTrue(user.has_perm("medication.add_medication"))
+
+    def test_group_membership_changes_invalidate_cached_permissions(self):
+        """
+        Test that changing groups directly, from either side of the relation,
+        refreshes the cached permission sets of the affected users
+        """
+        admins = Group.objects.get(name="Admins")
+        changes = [
+            (lambda: self.user.groups.add(admins), True),
+            (lambda: admins.user_groups.remove(self.user), False),
+            (lambda: admins.user_groups.add(self.user), True),
+            (lambda: admins.user_groups.clear(), False),
+        ]
+        for change, expected in changes:
+            UserModel.objects.get(pk=self.user.pk).has_perm("medication.add_medication")
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+
+            user = UserModel.objects.get(pk=self.user.pk)
+            self.assertEqual(user.has_perm("medication.add_medication"), expected)
+
+    def test_permission_cache_uses_shared_alias(self):
+        """
+        Test that permission sets live in the shared cache, so invalidations
+        made by one worker or management command reach every other worker
+        """
+        self.assertEqual(
+            settings.CACHES[settings.PERMISSION_CACHE_ALIAS]["BACKEND"],
+            settings.SHARED_CACHE["BACKEND"],
+        )
+
+    @override_settings(PERMISSION_CACHE_TIMEOUT=0)
+    def test_permissions_are_not_cached_without_shared_cache(self):
+        """
+        Test that permission sets are resolved per request when no shared
+        cache is configured
+        """
+        UserModel.objects.get(pk=self.user.pk).has_perm("medication.view_medication")
+
+        user = UserModel.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(2):
+            self.assertTrue(user.has_perm("medication.view_medication"))
+
+
+class RoleGroupSyncTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_groups", stdout=StringIO())
+        cls.user = UserModel.objects.create_user(
+            username="testuser",
+            password="testpassword",
+            email="test@gmail.com",
+            role=UserModel.Role.USER,
+        )
+
+    def test_new_user_is_added_to_role_group(self):
+        """
+        Test that creating a user puts them in their role's group
+        """
+        names = list(self.user.groups.values_list("name", flat=True))
+        self.assertEqual(names, ["Users"])
+
+    def test_save_without_role_change_skips_group_sync(self):
+        """
+        Test that saving an unchanged role only updates the user row
+        """
+        user = UserModel.objects.get(pk=self.user.pk)
+        user.failed_login_attempts = 1
+
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_role_change_replaces_role_group(self):
+        """
+        Test that changing the role swaps the user's role group
+        """
+        user = UserModel.objects.get(pk=self.user.pk)
+        user.role = UserModel.Role.ADMIN
+        user.save()
+
+        names = list(user.groups.values_list("name", flat=True))
+        self.assertEqual(names, ["Admins"])
+
+
+class SessionCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("user-info")
+        cls.username = "testuser"
+        cls.password = "testpassword"
+        cls.user = UserModel.objects.create_user(
+            username=cls.username,
+            password=cls.password,
+            email="test@gmail.com",
+            role=UserModel.Role.USER,
+        )
+
+    def setUp(self):
+        self.client.login(username=self.username, password=self.password)
+        # Warm the session and user caches
+        self.client.get(self.url)
+
+    def test_authenticated_request_resolves_identity_from_cache(self):
+        """
+        Test that a repeat request loads neither the session nor the user
+        """
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_role_change_refreshes_cached_user(self):
+        """
+        Test that saving the user replaces the cached copy once the change
+        commits, so no request can cache the old row again in between
+        """
+        self.addCleanup(_role_group_ids.clear)
+        user = UserModel.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.role = UserModel.Role.ADMIN
+            user.save()
+            response = self.client.get(self.url)
+            self.assertEqual(response.json()["data"]["role"], UserModel.Role.USER)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json()["data"]["role"], UserModel.Role.ADMIN)
+
+    def test_locked_out_user_is_reloaded(self):
+        """
+        Test that a lockout drops the cached user
+        """
+        UserModel.objects.filter(pk=self.user.pk).update(failed_login_attempts=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserModel.objects.record_failed_login(self.user.pk)
+        UserModel.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_logout_ends_cached_session(self):
+        """
+        Test that a logged out session no longer authenticates
+        """
+        self.client.post(reverse("logout"))
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PurgeSessionsCommandTests(APITestCase):
+    def setUp(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(
+                session_key=f"expired{i}",
+                session_data="",
+                expire_date=now - timedelta(days=1),
+            )
+        for i in range(2):
+            Session.objects.create(
+                session_key=f"live{i}",
+                session_data="",
+                expire_date=now + timedelta(days=1),
+            )
+
+    def test_expired_sessions_are_deleted_in_batches(self):
+        """
+        Test that every expired session is removed across several batches
+        """
+        out = StringIO()
+        call_command("purge_sessions", batch_size=2, sleep=0, stdout=out)
+
+        self.assertIn("Deleted 5 expired sessions", out.getvalue())
+        self.assertEqual(
+            sorted(Session.objects.values_list("session_key", flat=True)),
+            ["live0", "live1"],
+        )
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def cache_key(user_id):
+    return f"user:{user_id}"
+
+
+def get_cached_user(user_id):
+    return caches[settings.USER_CACHE_ALIAS].get(cache_key(user_id))
+
+
+def cache_user(user):
+    caches[settings.USER_CACHE_ALIAS].set(
+        cache_key(user.pk), user, settings.USER_CACHE_TIMEOUT
+    )
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drop the cached user so the next request reloads it, e.g. after a
+    logout, a lockout or any change to the user row. Inside a transaction
+    this happens once it commits, so a concurrent request cannot cache the
+    old row again in between.
+    """
+    transaction.on_commit(
+        lambda: caches[settings.USER_CACHE_ALIAS].delete(cache_key(user_id))
+    )
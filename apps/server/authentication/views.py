@@ -16,6 +16,7 @@ from app.utils import json_response, ratelimit
 
 from .permissions import HasRegisterPermission
 from .serializers import LoginSerializer, RegistrationSerializer, UserSerializer
+from .user_cache import invalidate_cached_user
 
 UserModel = get_user_model()
 
@@ -25,16 +26,8 @@ class LoginApiView(APIView):
     permission_classes = [AllowAny]
 
     @method_decorator(csrf_protect)
-    @method_decorator(ratelimit(key="ip", rate="5/30s", method="POST", block=True))
+    @method_decorator(ratelimit("login", key="ip", method="POST"))
     def post(self, request):
-        # Check if the request was blocked by the rate limit
-        if getattr(request, "limited", False):
-            return json_response(
-                code=RESPONSE_CODES["TOO_MANY_REQUESTS"],
-                data=None,
-                status_code=HTTP_403_FORBIDDEN,
-            )
-
         # Validate login data
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
@@ -62,8 +55,7 @@ class LoginApiView(APIView):
                 )
                 if user_auth:
                     # Successful login: reset failed login attempts
-                    user.failed_login_attempts = 0
-                    user.save()
+                    UserModel.objects.reset_failed_logins(user.pk)
 
                     login(request, user_auth)
                     user_data = UserSerializer(user_auth).data
@@ -74,10 +66,7 @@ class LoginApiView(APIView):
                     )
                 else:
                     # Failed authentication: increment failed login attempts
-                    user.failed_login_attempts += 1
-                    if user.failed_login_attempts >= 5:
-                        user.is_locked = True
-                    user.save()
+                    UserModel.objects.record_failed_login(user.pk)
                     return json_response(
                         code=RESPONSE_CODES["INVALID_CREDENTIALS"],
                         data=None,
@@ -104,6 +93,7 @@ class LogoutApiView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        invalidate_cached_user(request.user.pk)
         logout(request)
         return json_response(
             code=RESPONSE_CODES["LOGOUT_SUCCESS"],
@@ -117,16 +107,8 @@ class RegisterApiView(APIView):
     permission_classes = [HasRegisterPermission]
 
     @method_decorator(csrf_protect)
-    @method_decorator(ratelimit(key="ip", rate="5/30s", method="POST", block=True))
+    @method_decorator(ratelimit("register", key="user", method="POST"))
     def post(self, request):
-        # Check if the request was blocked by the rate limit
-        if getattr(request, "limited", False):
-            return json_response(
-                code=RESPONSE_CODES["TOO_MANY_REQUESTS"],
-                data=None,
-                status_code=HTTP_403_FORBIDDEN,
-            )
-
         serializer = RegistrationSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
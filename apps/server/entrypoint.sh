@@ -6,4 +6,5 @@
 
 python manage.py seed_groups
 
-gunicorn --bind 0.0.0.0:8000 app.wsgi:application
\ No newline at end of file
+# Worker type, count and lifecycle are configured in gunicorn.conf.py
+gunicorn --config gunicorn.conf.py
\ No newline at end of file
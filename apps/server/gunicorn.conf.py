@@ -0,0 +1,101 @@
+"""
+Gunicorn configuration, tuned from the environment.
+
+Worker type defaults to gthread, or uvicorn when SERVER_MODE=asgi, and the
+worker count is derived from the CPUs available to the container.
+"""
+
+import os
+
+server_mode = os.getenv("SERVER_MODE", "wsgi")
+# Blank values, as copied from .env.example, fall back to the defaults
+worker_type = os.getenv("GUNICORN_WORKER_TYPE") or (
+    "uvicorn" if server_mode == "asgi" else "gthread"
+)
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "uvicorn": "uvicorn_worker.UvicornWorker",
+}
+worker_class = WORKER_CLASSES[worker_type]
+wsgi_app = (
+    "app.asgi:application" if worker_type == "uvicorn" else "app.wsgi:application"
+)
+
+
+def cpu_count():
+    # Respect the CPU set the container is pinned to
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Sync workers block on I/O so they need extra processes to keep CPUs busy;
+# threaded and async workers overlap I/O within one process per CPU
+default_workers = cpu_count() * 2 + 1 if worker_type == "sync" else cpu_count()
+workers = int(os.getenv("GUNICORN_WORKERS") or default_workers)
+threads = int(os.getenv("GUNICORN_THREADS") or "4") if worker_type == "gthread" else 1
+
+bind = os.getenv("GUNICORN_BIND") or "0.0.0.0:8000"
+
+# Import the application once in the master so workers share its memory
+# copy-on-write and start faster
+preload_app = (os.getenv("GUNICORN_PRELOAD") or "True") == "True"
+
+# Recycle workers periodically, staggered so they do not all restart at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS") or "1000")
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER") or "100")
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT") or "30")
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT") or "30")
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE") or "5")
+
+# Keep worker heartbeats off the container's overlay filesystem
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = "-"
+
+
+def when_ready(server):
+    """
+    Close anything the master opened while preloading the application, so
+    no database connection or pool is inherited by the workers.
+    """
+    if not server.cfg.preload_app:
+        return
+
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        connection.close_pool()
+
+
+def post_fork(server, worker):
+    """
+    Forget database pools and connections copied from the master. They are
+    not closed, since that would shut sockets the master still holds. Each
+    worker opens its own pool on first use.
+    """
+    if not server.cfg.preload_app:
+        return
+
+    from django.db import connections
+    from django.db.backends.postgresql.base import DatabaseWrapper
+
+    DatabaseWrapper._connection_pools.clear()
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
+
+
+def worker_exit(server, worker):
+    """
+    Return pooled connections to Postgres when a worker is recycled.
+    """
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        connection.close_pool()
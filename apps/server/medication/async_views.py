@@ -0,0 +1,140 @@
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+)
+
+from app.pagination import InvalidCursor, KeysetPaginator
+from app.response_codes import RESPONSE_CODES
+from app.streaming import to_async_stream, wants_stream
+from app.utils import json_response, ratelimit
+
+from . import cache as medication_cache
+from .models import Medication
+from .serializers import RefillRequestDetailSerializer, RefillRequestFilterSerializer
+from .views import MedicationApiView, RefillRequestApiView
+
+
+class AsyncMedicationApiView(AsyncAPIView, MedicationApiView):
+    """
+    ASGI-native MedicationApiView. Reads go through the async ORM so one
+    worker can serve many slow clients at once; writes and full streams
+    reuse the synchronous handlers in a worker thread.
+    """
+
+    @ratelimit("medication_read", key="user", method="GET")
+    async def get(self, request, pk=None):
+        # Absolute image URLs depend on the host the request was made to
+        base_url = request.build_absolute_uri("/")
+
+        if pk:
+            return await self.aget_medication_detail(request, pk, base_url)
+        if wants_stream(request):
+            response = await sync_to_async(self.list_medications)(request, base_url)
+            return to_async_stream(response)
+        return await self.alist_medications(request, base_url)
+
+    async def aget_medication_detail(self, request, pk, base_url):
+        # Cache lookups and stores may wait on Redis, so they run off the loop
+        cache_key, payload = await sync_to_async(medication_cache.lookup)(
+            f"detail:{pk}:{base_url}"
+        )
+        if payload is not None:
+            return self.cached_response(request, "MEDICATION_DETAIL_SUCCESS", payload)
+
+        try:
+            medication = await Medication.objects.aget(pk=pk)
+        except Medication.DoesNotExist:
+            return json_response(
+                code=RESPONSE_CODES["MEDICATION_NOT_FOUND"],
+                data=None,
+                status_code=HTTP_404_NOT_FOUND,
+            )
+        return await sync_to_async(self.medication_detail_response)(
+            request, pk, base_url, medication, cache_key
+        )
+
+    async def alist_medications(self, request, base_url):
+        paginator = KeysetPaginator(ordering_field="created_at")
+        cursor = request.query_params.get("cursor", "")
+        page_size = paginator.get_page_size(request)
+
+        cache_key, payload = await sync_to_async(medication_cache.lookup)(
+            f"list:{cursor}:{page_size}:{base_url}"
+        )
+        if payload is not None:
+            return self.cached_response(request, "MEDICATION_LIST_SUCCESS", payload)
+
+        try:
+            medications, pagination = await paginator.apaginate(
+                Medication.objects.all(), request
+            )
+        except InvalidCursor:
+            return json_response(
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data="Invalid cursor",
+                status_code=HTTP_400_BAD_REQUEST,
+            )
+        return await sync_to_async(self.medication_list_response)(
+            request, base_url, cursor, page_size, medications, pagination, cache_key
+        )
+
+    async def post(self, request):
+        return await sync_to_async(super().post)(request)
+
+    async def put(self, request, pk=None):
+        return await sync_to_async(super().put)(request, pk)
+
+    async def delete(self, request, pk=None):
+        return await sync_to_async(super().delete)(request, pk)
+
+
+class AsyncRefillRequestApiView(AsyncAPIView, RefillRequestApiView):
+    """
+    ASGI-native RefillRequestApiView. Paginated listing uses the async ORM;
+    writes, streams, exports and the counter/rollup reads reuse the
+    synchronous handlers in a worker thread.
+    """
+
+    async def get(self, request):
+        if wants_stream(request) or request.path.endswith(
+            ("/aggregate/", "/analytics/", "/export/")
+        ):
+            response = await sync_to_async(super().get)(request)
+            return to_async_stream(response)
+
+        filters = RefillRequestFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return json_response(
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data=filters.errors,
+                status_code=HTTP_400_BAD_REQUEST,
+            )
+
+        paginator = KeysetPaginator(ordering_field="requested_at")
+        try:
+            refill_requests, pagination = await paginator.apaginate(
+                self.visible_refill_requests(request, filters), request
+            )
+        except InvalidCursor:
+            return json_response(
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data="Invalid cursor",
+                status_code=HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = RefillRequestDetailSerializer(refill_requests, many=True)
+        return json_response(
+            code=RESPONSE_CODES["REFILL_REQUEST_LIST_SUCCESS"],
+            data=serializer.data,
+            status_code=HTTP_200_OK,
+            pagination=pagination,
+        )
+
+    async def post(self, request):
+        return await sync_to_async(super().post)(request)
+
+    async def put(self, request, pk=None):
+        return await sync_to_async(super().put)(request, pk)
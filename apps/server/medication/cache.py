@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from app import metrics
+from app.versioning import bump_version, get_version
+
+VERSION_KEY = "medication:catalog-version"
+
+
+class LRUBackend:
+    """
+    Bounded in-process store. Entries are evicted least-recently-used first
+    and expire after the configured timeout. They are invalidated through the
+    catalog version kept in the shared cache.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key, payload, timeout):
+        with self._lock:
+            self._entries[key] = (payload, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.MEDICATION_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SharedBackend:
+    """
+    Store backed by a Django cache alias, shared by every worker that points
+    at the same cache server.
+    """
+
+    def get(self, key):
+        return caches[settings.MEDICATION_CACHE_ALIAS].get(key)
+
+    def set(self, key, payload, timeout):
+        caches[settings.MEDICATION_CACHE_ALIAS].set(key, payload, timeout)
+
+    def clear(self):
+        bump_catalog_version()
+
+
+BACKENDS = {
+    "lru": LRUBackend(),
+    "shared": SharedBackend(),
+}
+
+
+def get_catalog_version():
+    return get_version(settings.MEDICATION_CACHE_ALIAS, VERSION_KEY)
+
+
+def bump_catalog_version():
+    bump_version(settings.MEDICATION_CACHE_ALIAS, VERSION_KEY)
+
+
+def lookup(key):
+    """
+    Return ``(versioned_key, payload)`` for ``key`` under the current catalog
+    version. ``payload`` is None on a miss; store the freshly built payload
+    with ``store(versioned_key, payload)`` so it is filed under the version
+    that was current before the database was read.
+    """
+    backend = BACKENDS.get(settings.MEDICATION_CACHE_BACKEND)
+    if backend is None:
+        return None, None
+
+    versioned_key = f"medication:{get_catalog_version()}:{key}"
+    payload = backend.get(versioned_key)
+    if payload is not None:
+        metrics.increment("medication_cache_hits")
+    else:
+        metrics.increment("medication_cache_misses")
+    return versioned_key, payload
+
+
+def store(versioned_key, payload):
+    backend = BACKENDS.get(settings.MEDICATION_CACHE_BACKEND)
+    if backend is None or versioned_key is None:
+        return
+    backend.set(versioned_key, payload, settings.MEDICATION_CACHE_TIMEOUT)
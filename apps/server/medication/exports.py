@@ -0,0 +1,64 @@
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
+
+from app.renderers import FastJSONRenderer
+from app.streaming import iterate_rows
+
+EXPORT_COLUMNS = {
+    "id": "id",
+    "user_id": "user_id",
+    "medication_id": "medication_id",
+    "medication_name": "medication__name",
+    "quantity": "quantity",
+    "status": "status",
+    "requested_at": "requested_at",
+    "updated_at": "updated_at",
+}
+
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def export_refill_requests(queryset, export_format):
+    """
+    Yield the refill requests in ``queryset`` as CSV or NDJSON byte chunks,
+    reading flat rows from a server-side cursor so memory use stays constant.
+    """
+    rows = iterate_rows(
+        queryset.order_by("requested_at", "id").values_list(*EXPORT_COLUMNS.values())
+    )
+    writer = _csv_chunk if export_format == "csv" else _ndjson_chunk
+
+    if export_format == "csv":
+        yield _csv_chunk([list(EXPORT_COLUMNS)])
+    while chunk := list(islice(rows, settings.STREAMING_CHUNK_SIZE)):
+        yield writer(chunk)
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_cell(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def _csv_cell(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    # Spreadsheets run text starting with these as a formula; quote it so
+    # user-entered names reach admins as plain text
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def _ndjson_chunk(rows):
+    columns = list(EXPORT_COLUMNS)
+    renderer = FastJSONRenderer()
+    return b"".join(renderer.render(dict(zip(columns, row))) + b"\n" for row in rows)
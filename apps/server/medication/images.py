@@ -0,0 +1,132 @@
+import hashlib
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from app import metrics
+
+from .cache import bump_catalog_version
+from .models import MedicationImageJob
+
+DERIVATIVE_DIR = "medications/derivatives"
+
+
+def derivative_name(digest, max_size):
+    # Names only depend on the source bytes and the output settings, so a
+    # derivative can be cached forever and is never regenerated needlessly
+    return (
+        f"{DERIVATIVE_DIR}/{digest[:24]}-{max_size}"
+        f"-q{settings.MEDICATION_IMAGE_QUALITY}.webp"
+    )
+
+
+def render_webp(image, max_size):
+    image = image.copy()
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    output = BytesIO()
+    image.save(
+        output, format="WEBP", quality=settings.MEDICATION_IMAGE_QUALITY, method=4
+    )
+    return output.getvalue()
+
+
+def generate_image_variants(medication):
+    """
+    Write a WebP derivative of ``medication.image`` for every size in
+    ``settings.MEDICATION_IMAGE_SIZES`` and record their storage names in
+    ``medication.image_variants``. Existing derivatives are reused.
+    """
+    if not medication.image:
+        variants = {}
+    else:
+        with medication.image.open("rb") as source:
+            original = source.read()
+        digest = hashlib.sha256(original).hexdigest()
+
+        image = None
+        variants = {}
+        for size_name, max_size in settings.MEDICATION_IMAGE_SIZES.items():
+            name = derivative_name(digest, max_size)
+            if not default_storage.exists(name):
+                if image is None:
+                    # Apply the camera orientation once for every size
+                    image = ImageOps.exif_transpose(Image.open(BytesIO(original)))
+                name = default_storage.save(
+                    name, ContentFile(render_webp(image, max_size))
+                )
+            variants[size_name] = name
+
+    if variants != medication.image_variants:
+        medication.image_variants = variants
+        medication.save(update_fields=["image_variants", "updated_at"])
+    return variants
+
+
+def enqueue_image_job(medication):
+    """
+    Queue the derivatives of ``medication.image`` for the image worker. The
+    job only becomes visible to workers once the caller's transaction commits.
+    """
+    return MedicationImageJob.objects.create(medication=medication)
+
+
+def process_next_image_job():
+    """
+    Claim the oldest due image job and generate its derivatives. Returns
+    None when no job is due, otherwise whether the job succeeded.
+
+    The job row stays locked until it is finished, and ``SKIP LOCKED`` lets
+    concurrent workers pass over it, so each job runs on one worker only and
+    is picked up again if that worker dies.
+    """
+    with transaction.atomic():
+        job = (
+            MedicationImageJob.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("medication")
+            .filter(
+                status=MedicationImageJob.Status.QUEUED, run_after__lte=timezone.now()
+            )
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        previous = job.medication.image_variants
+        try:
+            with transaction.atomic():
+                variants = generate_image_variants(job.medication)
+        except Exception as exc:
+            record_image_job_failure(job, exc)
+            metrics.increment("image_jobs_failed")
+            return False
+
+        job.delete()
+        if variants != previous:
+            transaction.on_commit(bump_catalog_version)
+        metrics.increment("image_jobs_completed")
+        return True
+
+
+def record_image_job_failure(job, exc):
+    """
+    Schedule a retry with exponential backoff, or mark the job failed once
+    it has used up its attempts.
+    """
+    job.attempts += 1
+    job.last_error = f"{type(exc).__name__}: {exc}"
+    if job.attempts >= settings.MEDICATION_IMAGE_JOB_MAX_ATTEMPTS:
+        job.status = MedicationImageJob.Status.FAILED
+    else:
+        delay = settings.MEDICATION_IMAGE_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+    job.save(update_fields=["attempts", "last_error", "status", "run_after"])
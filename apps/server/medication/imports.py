@@ -0,0 +1,185 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .cache import bump_catalog_version
+from .exports import EXPORT_FORMATS
+from .models import Medication
+from .serializers import MedicationImportSerializer
+
+IMPORT_FORMATS = EXPORT_FORMATS
+
+# Columns overwritten when an imported code already exists
+UPSERT_FIELDS = ["name", "dosage", "quantity", "instructions", "updated_at"]
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        # Keep the report bounded; the failure count still covers every row
+        if len(self.errors) < settings.MEDICATION_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def stop(self, line, message):
+        # Always reported, since it explains why the remaining rows are missing
+        self.failed += 1
+        self.errors.append({"line": line, "errors": {"non_field_errors": [message]}})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def detect_format(content_type="", filename=""):
+    """
+    Return the import format matching a media type or file extension.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    for import_format, format_media_type in IMPORT_FORMATS.items():
+        if media_type == format_media_type or filename.lower().endswith(
+            f".{import_format}"
+        ):
+            return import_format
+    return None
+
+
+def read_rows(lines, import_format):
+    """
+    Yield ``(line, row)`` pairs from an iterable of byte lines in CSV (with a
+    header row) or NDJSON. ``row`` is None when the line cannot be parsed.
+    """
+    text = codecs.iterdecode(lines, "utf-8-sig")
+    if import_format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError:
+            row = None
+        yield line, row if isinstance(row, dict) else None
+
+
+def import_medications(lines, import_format, added_by=None, batch_size=None):
+    """
+    Create or update medications from CSV or NDJSON ``lines``, matched on
+    their ``code``, and return a report of the outcome with the errors of
+    every rejected row.
+
+    Rows are validated a batch at a time and each batch is upserted with a
+    single ``INSERT ... ON CONFLICT`` in its own transaction, so a large
+    file never holds locks for long and earlier batches stay committed.
+    """
+    batch_size = batch_size or settings.MEDICATION_IMPORT_BATCH_SIZE
+    rows = read_rows(lines, import_format)
+    report = ImportReport()
+    last_line = 1 if import_format == "csv" else 0
+
+    while True:
+        batch, unreadable = read_batch(rows, batch_size)
+        valid = {}
+        for line, row in batch:
+            last_line = line
+            if row is None:
+                report.add_error(line, {"non_field_errors": ["Malformed row."]})
+                continue
+            serializer = MedicationImportSerializer(data=row)
+            if serializer.is_valid():
+                # A code repeated within the batch keeps its last row, as it
+                # would across batches
+                valid[serializer.validated_data["code"]] = serializer.validated_data
+            else:
+                report.add_error(line, serializer.errors)
+
+        if valid:
+            created, updated = upsert_medications(valid, added_by)
+            report.created += created
+            report.updated += updated
+
+        if unreadable is not None:
+            # Batches written so far stay committed; the rest is not read
+            report.stop(last_line + 1, f"Unreadable file: {unreadable}")
+            break
+        if len(batch) < batch_size:
+            break
+
+    return report
+
+
+def read_batch(rows, batch_size):
+    """
+    Read up to ``batch_size`` rows, returning them with the decoding or CSV
+    error that stopped reading early, if any.
+    """
+    batch = []
+    try:
+        for row in islice(rows, batch_size):
+            batch.append(row)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        return batch, exc
+    return batch, None
+
+
+def upsert_medications(rows_by_code, added_by):
+    """
+    Insert or update ``rows_by_code`` in one ``INSERT ... ON CONFLICT`` and
+    return how many rows were created and updated. The split comes from the
+    statement itself (``xmax`` is 0 only for freshly inserted rows), so it
+    stays exact when another import or write touches the same codes.
+    """
+    quote = connection.ops.quote_name
+    fields = [
+        field for field in Medication._meta.concrete_fields if not field.primary_key
+    ]
+    rows = []
+    for data in rows_by_code.values():
+        medication = Medication(added_by=added_by, **data)
+        rows.append(
+            [
+                field.get_db_prep_save(field.pre_save(medication, True), connection)
+                for field in fields
+            ]
+        )
+
+    columns = ", ".join(quote(field.column) for field in fields)
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(fields)) + ")"] * len(rows))
+    updates = ", ".join(
+        f"{quote(column)} = EXCLUDED.{quote(column)}"
+        for column in (
+            Medication._meta.get_field(name).column for name in UPSERT_FIELDS
+        )
+    )
+    sql = (
+        f"INSERT INTO {quote(Medication._meta.db_table)} ({columns}) "
+        f"VALUES {placeholders} "
+        f"ON CONFLICT ({quote(Medication._meta.get_field('code').column)}) "
+        f"DO UPDATE SET {updates} RETURNING (xmax = 0)"
+    )
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [value for row in rows for value in row])
+            inserted = [row[0] for row in cursor.fetchall()]
+        # Each committed batch becomes visible through the catalog cache
+        transaction.on_commit(bump_catalog_version)
+    created = sum(inserted)
+    return created, len(inserted) - created
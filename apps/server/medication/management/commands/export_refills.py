@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from medication.exports import EXPORT_FORMATS, export_refill_requests
+from medication.models import RefillRequest
+from medication.serializers import RefillRequestFilterSerializer
+
+
+class Command(BaseCommand):
+    help = "Export refill requests as CSV or NDJSON using a server-side cursor"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=list(EXPORT_FORMATS),
+            default="csv",
+            dest="export_format",
+        )
+        parser.add_argument("--status", help="Only export requests with this status")
+        parser.add_argument(
+            "--start", help="Only export requests made at or after this ISO datetime"
+        )
+        parser.add_argument(
+            "--end", help="Only export requests made before this ISO datetime"
+        )
+        parser.add_argument(
+            "--output", help="File to write to (defaults to standard output)"
+        )
+
+    def handle(self, *args, **options):
+        filter_data = {
+            "status": options["status"],
+            "requested_after": options["start"],
+            "requested_before": options["end"],
+        }
+        filters = RefillRequestFilterSerializer(
+            data={key: value for key, value in filter_data.items() if value}
+        )
+        if not filters.is_valid():
+            raise CommandError(filters.errors)
+
+        chunks = export_refill_requests(
+            filters.filter_queryset(RefillRequest.objects.all()),
+            options["export_format"],
+        )
+
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                for chunk in chunks:
+                    output.write(chunk)
+            self.stderr.write(
+                self.style.SUCCESS(f"Exported refill requests to {options['output']}")
+            )
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending="")
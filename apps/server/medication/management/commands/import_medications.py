@@ -0,0 +1,51 @@
+import json
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from medication.imports import IMPORT_FORMATS, detect_format, import_medications
+
+
+class Command(BaseCommand):
+    help = "Create or update medications in bulk from a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for standard input")
+        parser.add_argument(
+            "--format",
+            choices=list(IMPORT_FORMATS),
+            dest="import_format",
+            help="File format (defaults to the file extension)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.MEDICATION_IMPORT_BATCH_SIZE,
+            help="Rows validated and written per transaction",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        import_format = options["import_format"] or detect_format(filename=path)
+        if import_format is None:
+            raise CommandError("Pass --format, the file extension is not recognised.")
+
+        if path == "-":
+            report = import_medications(
+                sys.stdin.buffer, import_format, batch_size=options["batch_size"]
+            )
+        else:
+            with open(path, "rb") as lines:
+                report = import_medications(
+                    lines, import_format, batch_size=options["batch_size"]
+                )
+
+        for error in report.errors:
+            self.stderr.write(f"Line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported medications: {report.created} created, "
+                f"{report.updated} updated, {report.failed} rejected."
+            )
+        )
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from medication.models import RefillRequest, RefillRequestCounter
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-medication refill request counters from the raw refill requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report counters that drifted, without fixing them",
+        )
+
+    def handle(self, *args, **options):
+        check_only = options["check"]
+
+        with transaction.atomic():
+            # Block concurrent counter updates until the rebuild commits so no
+            # refill request created meanwhile is counted twice or missed.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {RefillRequestCounter._meta.db_table} "
+                    "IN SHARE ROW EXCLUSIVE MODE"
+                )
+
+            actual = {
+                (row["medication_id"], row["status"]): row["total"]
+                for row in RefillRequest.objects.values(
+                    "medication_id", "status"
+                ).annotate(total=Count("id"))
+            }
+            stored = {
+                (counter.medication_id, counter.status): counter
+                for counter in RefillRequestCounter.objects.all()
+            }
+
+            to_create = []
+            to_update = []
+            stale = []
+            for key, total in actual.items():
+                counter = stored.get(key)
+                if counter is None:
+                    to_create.append(
+                        RefillRequestCounter(
+                            medication_id=key[0], status=key[1], count=total
+                        )
+                    )
+                elif counter.count != total:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"Counter for medication {key[0]} ({key[1]}) "
+                            f"is {counter.count}, expected {total}"
+                        )
+                    )
+                    counter.count = total
+                    to_update.append(counter)
+            for key, counter in stored.items():
+                if key not in actual and counter.count != 0:
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"Counter for medication {key[0]} ({key[1]}) "
+                            f"is {counter.count}, expected 0"
+                        )
+                    )
+                    stale.append(counter.pk)
+
+            drifted = len(to_create) + len(to_update) + len(stale)
+            if check_only:
+                transaction.set_rollback(True)
+                self.stdout.write(
+                    self.style.SUCCESS(f"Found {drifted} drifted refill counters.")
+                )
+                return
+
+            RefillRequestCounter.objects.bulk_create(to_create)
+            RefillRequestCounter.objects.bulk_update(to_update, ["count"])
+            RefillRequestCounter.objects.filter(pk__in=stale).update(count=0)
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {drifted} refill counters."))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from medication.rollups import refresh_refill_rollups
+
+
+class Command(BaseCommand):
+    help = "Fill the hourly, daily and weekly refill request rollup tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Discard existing rollups and rebuild them from every refill request",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and refresh the rollups every N seconds",
+        )
+
+    def handle(self, *args, **options):
+        full = options["full"]
+        interval = options["interval"]
+
+        while True:
+            recomputed = refresh_refill_rollups(full=full)
+            self.stdout.write(
+                self.style.SUCCESS(f"Recomputed {recomputed} refill rollup buckets.")
+            )
+            if interval <= 0:
+                return
+            full = False
+            time.sleep(interval)
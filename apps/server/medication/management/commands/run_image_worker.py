@@ -0,0 +1,63 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from medication.images import process_next_image_job
+
+
+class Command(BaseCommand):
+    help = "Generate medication image derivatives from the image job queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is due instead of waiting for more",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.MEDICATION_IMAGE_WORKER_POLL_INTERVAL,
+            help="Seconds to wait before checking an empty queue again",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        handlers = {
+            signum: signal.signal(signum, self.stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            completed, failed = self.work(options["once"], options["poll_interval"])
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {completed} image jobs, {failed} failed attempts."
+            )
+        )
+
+    def work(self, once, poll_interval):
+        completed = failed = 0
+        while not self.stopping:
+            succeeded = process_next_image_job()
+            if succeeded is None:
+                if once:
+                    break
+                close_old_connections()
+                time.sleep(poll_interval)
+            elif succeeded:
+                completed += 1
+            else:
+                failed += 1
+                self.stderr.write("An image job attempt failed.")
+        return completed, failed
+
+    def stop(self, signum, frame):
+        # Finish the job in progress, then exit
+        self.stopping = True
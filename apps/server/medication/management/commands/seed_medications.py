@@ -1,7 +1,7 @@
 import random
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
-from medication.models import Medication, RefillRequest
+from medication.models import Medication, RefillRequest, RefillRequestCounter
 
 UserModel = get_user_model()
 
@@ -76,11 +76,14 @@ class Command(BaseCommand):
             # Create random refill requests for each medication
             num_requests = random.randint(1, 5)  # Number of refill requests to create
             for _ in range(num_requests):
-                RefillRequest.objects.create(
+                refill_request = RefillRequest.objects.create(
                     user=random.choice(users),
                     medication=medication,
                     quantity=random.randint(1, 10),  # Random quantity between 1 and 10
                     status=random.choice(["PENDING", "APPROVED", "DENIED"]),
                 )
+                RefillRequestCounter.objects.adjust(
+                    medication.id, refill_request.status, 1
+                )
 
         self.stdout.write(self.style.SUCCESS("Seeding of medications and refill requests completed successfully."))
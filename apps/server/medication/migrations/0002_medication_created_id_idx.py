@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("medication", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="medication",
+            index=models.Index(
+                fields=["created_at", "id"], name="medication_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("medication", "0002_medication_created_id_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="refillrequest",
+            index=models.Index(
+                fields=["requested_at", "id"], name="refill_requested_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="refillrequest",
+            index=models.Index(
+                fields=["status", "requested_at", "id"],
+                name="refill_status_requested_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="refillrequest",
+            index=models.Index(
+                fields=["user", "requested_at", "id"], name="refill_user_requested_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="refillrequest",
+            index=models.Index(
+                fields=["medication", "requested_at", "id"],
+                name="refill_med_requested_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    RefillRequest = apps.get_model("medication", "RefillRequest")
+    RefillRequestCounter = apps.get_model("medication", "RefillRequestCounter")
+
+    totals = RefillRequest.objects.values("medication_id", "status").annotate(
+        total=Count("id")
+    )
+    RefillRequestCounter.objects.bulk_create(
+        RefillRequestCounter(
+            medication_id=row["medication_id"],
+            status=row["status"],
+            count=row["total"],
+        )
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("medication", "0003_refill_request_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RefillRequestCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("APPROVED", "Approved"),
+                            ("DENIED", "Denied"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "medication",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="refill_counters",
+                        to="medication.medication",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("medication", "status"), name="unique_refill_counter"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("medication", "0005_refill_request_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="medication",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("medication", "0007_medicationimagejob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="medication",
+            name="code",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
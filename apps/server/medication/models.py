@@ -1,15 +1,21 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
 
 UserModel = get_user_model()
 
 
 class Medication(models.Model):
+    # Formulary code (e.g. NDC) identifying the medication in bulk imports
+    code = models.CharField(max_length=64, unique=True, blank=True, null=True)
     name = models.CharField(max_length=100)
     dosage = models.CharField(max_length=50)
     quantity = models.PositiveIntegerField()
     instructions = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to="medications/images/", blank=True, null=True)
+    # Storage names of the resized WebP derivatives of ``image``, by size name
+    image_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     added_by = models.ForeignKey(
@@ -19,10 +25,45 @@ class Medication(models.Model):
         related_name="added_medications",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="medication_created_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.dosage}"
 
 
+class MedicationImageJob(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        FAILED = "failed", "Failed"
+
+    medication = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, related_name="image_jobs"
+    )
+    status = models.CharField(
+        max_length=6, choices=Status.choices, default=Status.QUEUED
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Only queued jobs are ever polled, so failed ones stay out of the index
+            models.Index(
+                fields=["run_after", "id"],
+                name="image_job_queued_idx",
+                condition=Q(status="queued"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"MedicationImageJob({self.medication_id}, {self.status})"
+
+
 class RefillRequest(models.Model):
     STATUS_CHOICES = [
         ("PENDING", "Pending"),
@@ -41,5 +82,97 @@ class RefillRequest(models.Model):
     requested_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["requested_at", "id"], name="refill_requested_id_idx"),
+            models.Index(
+                fields=["status", "requested_at", "id"],
+                name="refill_status_requested_idx",
+            ),
+            models.Index(
+                fields=["user", "requested_at", "id"], name="refill_user_requested_idx"
+            ),
+            models.Index(
+                fields=["medication", "requested_at", "id"],
+                name="refill_med_requested_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"RefillRequest({self.user.username}, {self.medication.name}, {self.status})"
+
+
+class RefillRequestCounterManager(models.Manager):
+    def adjust(self, medication_id, status, delta):
+        """
+        Atomically add ``delta`` to the counter for a medication and status.
+        Must run inside the transaction that changes the refill request.
+        """
+        counters = self.filter(medication_id=medication_id, status=status)
+        if counters.update(count=F("count") + delta):
+            return
+
+        counter, created = self.get_or_create(
+            medication_id=medication_id, status=status, defaults={"count": delta}
+        )
+        if not created:
+            counters.update(count=F("count") + delta)
+
+
+class RefillRequestCounter(models.Model):
+    medication = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, related_name="refill_counters"
+    )
+    status = models.CharField(max_length=10, choices=RefillRequest.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    objects = RefillRequestCounterManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["medication", "status"], name="unique_refill_counter"
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"RefillRequestCounter({self.medication_id}, {self.status}, {self.count})"
+        )
+
+
+class RefillRequestRollup(models.Model):
+    class Granularity(models.TextChoices):
+        HOUR = "hour", "Hour"
+        DAY = "day", "Day"
+        WEEK = "week", "Week"
+
+    medication = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, related_name="refill_rollups"
+    )
+    granularity = models.CharField(max_length=4, choices=Granularity.choices)
+    bucket_start = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=RefillRequest.STATUS_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "bucket_start", "medication", "status"],
+                name="unique_refill_rollup_bucket",
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"RefillRequestRollup({self.granularity}, {self.bucket_start}, "
+            f"{self.medication_id}, {self.status})"
+        )
+
+
+class RefillRequestRollupCheckpoint(models.Model):
+    processed_until = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"RefillRequestRollupCheckpoint({self.processed_until})"
@@ -17,6 +17,14 @@ class HasMedicationPermission(BasePermission):
         return False
 
 
+class HasMedicationImportPermission(BasePermission):
+    def has_permission(self, request, view):
+        # Imports both create new medications and update existing ones
+        return request.user.has_perms(
+            ["medication.add_medication", "medication.change_medication"]
+        )
+
+
 class HasRefillRequestPermission(BasePermission):
     def has_permission(self, request, view):
         user = request.user
@@ -0,0 +1,116 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.utils import timezone
+
+from .models import RefillRequest, RefillRequestRollup, RefillRequestRollupCheckpoint
+
+Granularity = RefillRequestRollup.Granularity
+
+BUCKETS = {
+    Granularity.HOUR: (TruncHour, timedelta(hours=1)),
+    Granularity.DAY: (TruncDay, timedelta(days=1)),
+    Granularity.WEEK: (TruncWeek, timedelta(weeks=1)),
+}
+
+
+def refresh_refill_rollups(full=False):
+    """
+    Bring the refill rollup tables up to date and return the number of
+    buckets that were recomputed.
+
+    Only buckets touched by refill requests updated since the last run are
+    rebuilt, re-reading a small overlap window so that transactions which
+    committed late are not missed. Recomputing a bucket is idempotent.
+    """
+    with transaction.atomic():
+        # Serialise concurrent runs on the checkpoint row
+        checkpoint, _ = (
+            RefillRequestRollupCheckpoint.objects.select_for_update().get_or_create(
+                pk=1
+            )
+        )
+        started_at = timezone.now()
+
+        if full or checkpoint.processed_until is None:
+            recomputed = _rebuild_all()
+        else:
+            overlap = timedelta(seconds=settings.REFILL_ROLLUP_OVERLAP_SECONDS)
+            changed = RefillRequest.objects.filter(
+                updated_at__gte=checkpoint.processed_until - overlap
+            )
+            recomputed = _rebuild_changed(changed)
+
+        checkpoint.processed_until = started_at
+        checkpoint.save()
+
+    return recomputed
+
+
+def _rebuild_all():
+    RefillRequestRollup.objects.all().delete()
+
+    recomputed = 0
+    for granularity, (trunc, _) in BUCKETS.items():
+        totals = (
+            RefillRequest.objects.annotate(bucket_start=trunc("requested_at"))
+            .values("medication_id", "bucket_start", "status")
+            .annotate(count=Count("id"), quantity=Sum("quantity"))
+            .order_by()
+        )
+        batch = []
+        for row in totals.iterator(chunk_size=settings.REFILL_ROLLUP_BATCH_SIZE):
+            batch.append(RefillRequestRollup(granularity=granularity, **row))
+            if len(batch) >= settings.REFILL_ROLLUP_BATCH_SIZE:
+                RefillRequestRollup.objects.bulk_create(batch)
+                recomputed += len(batch)
+                batch = []
+        RefillRequestRollup.objects.bulk_create(batch)
+        recomputed += len(batch)
+
+    return recomputed
+
+
+def _rebuild_changed(changed):
+    recomputed = 0
+    for granularity, (trunc, width) in BUCKETS.items():
+        touched = defaultdict(set)
+        for medication_id, bucket_start in (
+            changed.annotate(bucket_start=trunc("requested_at"))
+            .values_list("medication_id", "bucket_start")
+            .distinct()
+        ):
+            touched[bucket_start].add(medication_id)
+
+        for bucket_start, medication_ids in touched.items():
+            _rebuild_bucket(granularity, bucket_start, width, medication_ids)
+            recomputed += len(medication_ids)
+
+    return recomputed
+
+
+def _rebuild_bucket(granularity, bucket_start, width, medication_ids):
+    totals = (
+        RefillRequest.objects.filter(
+            medication_id__in=medication_ids,
+            requested_at__gte=bucket_start,
+            requested_at__lt=bucket_start + width,
+        )
+        .values("medication_id", "status")
+        .annotate(count=Count("id"), quantity=Sum("quantity"))
+        .order_by()
+    )
+
+    RefillRequestRollup.objects.filter(
+        granularity=granularity,
+        bucket_start=bucket_start,
+        medication_id__in=medication_ids,
+    ).delete()
+    RefillRequestRollup.objects.bulk_create(
+        RefillRequestRollup(granularity=granularity, bucket_start=bucket_start, **row)
+        for row in totals
+    )
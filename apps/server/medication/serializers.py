@@ -1,31 +1,68 @@
+from functools import cached_property
+
 from rest_framework import serializers
 
-from .models import Medication, RefillRequest
+from app.media import media_base_url, media_url
+
+from .models import Medication, RefillRequest, RefillRequestRollup
+
+
+class MediaImageField(serializers.ImageField):
+    """
+    Image field whose URL is built from the parent serializer's media base
+    URL, so listing many rows never resolves the host or storage per row.
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return media_url(self.parent.media_base_url, value.name)
 
 
 class MedicationSerializer(serializers.ModelSerializer):
-    image = serializers.SerializerMethodField()
+    image = MediaImageField(required=False, allow_null=True)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Medication
         fields = [
             "id",
+            "code",
             "name",
             "dosage",
             "quantity",
             "instructions",
             "image",
+            "image_variants",
             "added_by",
             "created_at",
             "updated_at",
         ]
         read_only_fields = ["id", "added_by", "created_at", "updated_at"]
 
-    def get_image(self, obj):
-        request = self.context.get("request")
-        if obj.image:
-            return request.build_absolute_uri(obj.image.url)
-        return None
+    @cached_property
+    def media_base_url(self):
+        # Views resolve the base once per request; serializing many rows
+        # reuses this child serializer, so it is computed at most once
+        base_url = self.context.get("media_base_url")
+        if base_url is None:
+            base_url = media_base_url(self.context.get("request"))
+        return base_url
+
+    def get_image_variants(self, obj):
+        """
+        Return the URL of each resized WebP derivative, keyed by size name.
+        """
+        if not obj.image_variants:
+            return None
+        return {
+            size_name: media_url(self.media_base_url, name)
+            for size_name, name in obj.image_variants.items()
+        }
+
+    def validate_code(self, value):
+        # Blank codes would collide on the unique constraint; store them as null
+        return value or None
 
     def create(self, validated_data):
         user = self.context["request"].user
@@ -33,6 +70,16 @@ class MedicationSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class MedicationImportSerializer(serializers.ModelSerializer):
+    # Declared explicitly so validating a row never queries for an existing
+    # code; imports update the medication with that code instead
+    code = serializers.CharField(max_length=64)
+
+    class Meta:
+        model = Medication
+        fields = ["code", "name", "dosage", "quantity", "instructions"]
+
+
 class RefillRequestSerializer(serializers.ModelSerializer):
     medication = serializers.PrimaryKeyRelatedField(queryset=Medication.objects.all())
 
@@ -68,3 +115,65 @@ class RefillRequestDetailSerializer(serializers.ModelSerializer):
             "requested_at",
             "updated_at",
         ]
+
+
+class RefillRequestFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(
+        choices=RefillRequest.STATUS_CHOICES, required=False
+    )
+    medication = serializers.IntegerField(required=False)
+    user = serializers.IntegerField(required=False)
+    requested_after = serializers.DateTimeField(required=False)
+    requested_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        after = attrs.get("requested_after")
+        before = attrs.get("requested_before")
+        if after and before and after > before:
+            raise serializers.ValidationError(
+                "requested_after must be earlier than requested_before."
+            )
+        return attrs
+
+    def filter_queryset(self, queryset):
+        filters = {
+            "status": "status",
+            "medication": "medication_id",
+            "user": "user_id",
+            "requested_after": "requested_at__gte",
+            "requested_before": "requested_at__lt",
+        }
+        lookups = {
+            lookup: self.validated_data[field]
+            for field, lookup in filters.items()
+            if field in self.validated_data
+        }
+        return queryset.filter(**lookups)
+
+
+class RefillAnalyticsFilterSerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(
+        choices=RefillRequestRollup.Granularity.choices,
+        default=RefillRequestRollup.Granularity.DAY,
+    )
+    status = serializers.ChoiceField(
+        choices=RefillRequest.STATUS_CHOICES, required=False
+    )
+    medication = serializers.IntegerField(required=False)
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    def filter_queryset(self, queryset):
+        filters = {
+            "granularity": "granularity",
+            "status": "status",
+            "medication": "medication_id",
+            "start": "bucket_start__gte",
+            "end": "bucket_start__lt",
+        }
+        lookups = {
+            lookup: self.validated_data[field]
+            for field, lookup in filters.items()
+            if field in self.validated_data
+        }
+        return queryset.filter(**lookups)
@@ -1,13 +1,34 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
 from unittest.mock import patch
 
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
 
 from app.response_codes import RESPONSE_CODES
-from medication.models import Medication, RefillRequest
+from medication import cache as medication_cache
+from medication.async_views import AsyncMedicationApiView, AsyncRefillRequestApiView
+from medication.imports import upsert_medications
+from medication.models import Medication, MedicationImageJob, RefillRequest
 from medication.serializers import MedicationSerializer, RefillRequestSerializer
 
 UserModel = get_user_model()
@@ -54,12 +75,91 @@ class MedicationApiViewTests(APITestCase):
         medications = Medication.objects.all()
         serializer = MedicationSerializer(medications, many=True)
 
+        expected_response = {
+            "code": RESPONSE_CODES["MEDICATION_LIST_SUCCESS"],
+            "data": serializer.data,
+            "next": None,
+            "prev": None,
+        }
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), expected_response)
+
+    def test_list_medications_paginates_with_cursors(self):
+        """
+        Test walking the medication list forwards and backwards with cursors
+        """
+        self.client.login(username=self.regular_user.username, password="userpass")
+
+        expected_ids = list(
+            Medication.objects.order_by("created_at", "id").values_list("id", flat=True)
+        )
+
+        first_page = self.client.get(self.list_url, {"page_size": 2}).json()
+        self.assertEqual([m["id"] for m in first_page["data"]], expected_ids[:2])
+        self.assertIsNone(first_page["prev"])
+        self.assertIsNotNone(first_page["next"])
+
+        second_page = self.client.get(
+            self.list_url, {"page_size": 2, "cursor": first_page["next"]}
+        ).json()
+        self.assertEqual([m["id"] for m in second_page["data"]], expected_ids[2:4])
+        self.assertIsNotNone(second_page["prev"])
+
+        back_page = self.client.get(
+            self.list_url, {"page_size": 2, "cursor": second_page["prev"]}
+        ).json()
+        self.assertEqual([m["id"] for m in back_page["data"]], expected_ids[:2])
+        self.assertIsNone(back_page["prev"])
+
+    def test_list_medications_last_page_has_no_next_cursor(self):
+        """
+        Test that the final page does not advertise a next cursor
+        """
+        self.client.login(username=self.regular_user.username, password="userpass")
+
+        total = Medication.objects.count()
+        response = self.client.get(self.list_url, {"page_size": total})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["data"]), total)
+        self.assertIsNone(response.json()["next"])
+
+    @override_settings(STREAMING_CHUNK_SIZE=2)
+    def test_stream_medications(self):
+        """
+        Test streaming the full medication list in chunks
+        """
+        self.client.login(username=self.regular_user.username, password="userpass")
+
+        response = self.client.get(self.list_url, {"stream": "true"})
+        body = json.loads(b"".join(response.streaming_content))
+
+        medications = Medication.objects.order_by("created_at", "id")
+        serializer = MedicationSerializer(medications, many=True)
+
         expected_response = {
             "code": RESPONSE_CODES["MEDICATION_LIST_SUCCESS"],
             "data": serializer.data,
         }
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body, expected_response)
+
+    def test_list_medications_with_invalid_cursor(self):
+        """
+        Test that a malformed cursor is rejected
+        """
+        self.client.login(username=self.regular_user.username, password="userpass")
+
+        response = self.client.get(self.list_url, {"cursor": "not-a-cursor"})
+
+        expected_response = {
+            "code": RESPONSE_CODES["VALIDATION_ERROR"],
+            "data": "Invalid cursor",
+        }
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.json(), expected_response)
 
     def test_retrieve_medication_detail(self):
@@ -384,16 +484,57 @@ class MedicationApiViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(response.json(), expected_response)
 
+    @override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMITS={"medication_write": "3/m"})
+    def test_medication_writes_are_rate_limited(self):
+        """
+        Test that creating, updating and deleting medications share one budget
+        """
+        caches[settings.RATE_LIMIT_CACHE_ALIAS].clear()
+        self.client.login(username=self.admin_user.username, password="adminpass")
+        data = {"name": "Rate Limited", "dosage": "5mg", "quantity": 10}
+        medication = Medication.objects.first()
+        url = reverse(self.detail_url_template, kwargs={"pk": medication.pk})
+
+        response = self.client.post(self.list_url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.put(url, {"quantity": 20}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        responses = [
+            self.client.post(self.list_url, data, format="json"),
+            self.client.put(url, {"quantity": 20}, format="json"),
+            self.client.delete(url),
+        ]
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_429_TOO_MANY_REQUESTS] * 3,
+        )
+
+
+from io import StringIO
 
+from django.conf import settings
+from django.core.cache import CacheHandler
 from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from app import metrics
 from app.response_codes import RESPONSE_CODES
 
-from .models import Medication, RefillRequest, UserModel
-from .serializers import RefillRequestSerializer
+from .cache import BACKENDS, bump_catalog_version
+from .models import (
+    Medication,
+    RefillRequest,
+    RefillRequestCounter,
+    RefillRequestRollup,
+    UserModel,
+)
+from .serializers import RefillRequestDetailSerializer, RefillRequestSerializer
 
 
 class RefillRequestApiViewTests(APITestCase):
@@ -508,17 +649,249 @@ class RefillRequestApiViewTests(APITestCase):
         self.client.login(username=self.regular_user.username, password="userpass")
 
         response = self.client.get(self.list_url)
-        refill_requests = RefillRequest.objects.filter(user=self.regular_user)
-        serializer = RefillRequestSerializer(refill_requests, many=True)
+        refill_requests = RefillRequest.objects.filter(user=self.regular_user).order_by(
+            "requested_at", "id"
+        )
+        serializer = RefillRequestDetailSerializer(refill_requests, many=True)
 
         expected_response = {
             "code": RESPONSE_CODES["REFILL_REQUEST_LIST_SUCCESS"],
             "data": serializer.data,
+            "next": None,
+            "prev": None,
         }
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json(), expected_response)
 
+    def test_list_refill_requests_filtered_by_status(self):
+        pending = RefillRequest.objects.create(
+            user=self.regular_user, medication=self.medication, status="PENDING"
+        )
+        RefillRequest.objects.create(
+            user=self.regular_user, medication=self.medication, status="APPROVED"
+        )
+
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        response = self.client.get(self.list_url, {"status": "PENDING"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in response.json()["data"]], [pending.id])
+
+    def test_list_refill_requests_filtered_by_user_and_date_range(self):
+        other_user = UserModel.objects.create_user(
+            username="otheruser",
+            password="otherpass",
+            email="other@example.com",
+            role=UserModel.Role.USER,
+        )
+        old_request = RefillRequest.objects.create(
+            user=self.regular_user, medication=self.medication
+        )
+        RefillRequest.objects.filter(pk=old_request.pk).update(
+            requested_at=timezone.now() - timedelta(days=10)
+        )
+        recent_request = RefillRequest.objects.create(
+            user=self.regular_user, medication=self.medication
+        )
+        RefillRequest.objects.create(user=other_user, medication=self.medication)
+
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        response = self.client.get(
+            self.list_url,
+            {
+                "user": self.regular_user.id,
+                "requested_after": (timezone.now() - timedelta(days=1)).isoformat(),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["id"] for r in response.json()["data"]], [recent_request.id]
+        )
+
+    @override_settings(STREAMING_CHUNK_SIZE=2)
+    def test_stream_refill_requests_with_filter(self):
+        pending_ids = [
+            RefillRequest.objects.create(
+                user=self.regular_user, medication=self.medication
+            ).id
+            for _ in range(3)
+        ]
+        RefillRequest.objects.create(
+            user=self.regular_user, medication=self.medication, status="DENIED"
+        )
+
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        response = self.client.get(
+            self.list_url, {"stream": "true", "status": "PENDING"}
+        )
+        body = json.loads(b"".join(response.streaming_content))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body["code"], RESPONSE_CODES["REFILL_REQUEST_LIST_SUCCESS"])
+        self.assertEqual([r["id"] for r in body["data"]], pending_ids)
+
+    def test_stream_refill_requests_empty(self):
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        response = self.client.get(self.list_url, {"stream": "true"})
+
+        self.assertEqual(
+            json.loads(b"".join(response.streaming_content)),
+            {"code": RESPONSE_CODES["REFILL_REQUEST_LIST_SUCCESS"], "data": []},
+        )
+
+    def test_export_refill_requests_as_csv(self):
+        refill_request = RefillRequest.objects.create(
+            user=self.regular_user, medication=self.medication, quantity=3
+        )
+        RefillRequest.objects.create(
+            user=self.regular_user, medication=self.medication, status="DENIED"
+        )
+
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        response = self.client.get(
+            reverse("export"), {"output": "csv", "status": "PENDING"}
+        )
+        rows = list(
+            csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], str(refill_request.id))
+        self.assertEqual(rows[0]["medication_name"], self.medication.name)
+        self.assertEqual(rows[0]["quantity"], "3")
+
+    def test_export_csv_neutralises_formulas(self):
+        medication = Medication.objects.create(
+            name='=HYPERLINK("http://example.com")', dosage="1mg", quantity=1
+        )
+        RefillRequest.objects.create(user=self.regular_user, medication=medication)
+
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        response = self.client.get(reverse("export"), {"output": "csv"})
+        rows = list(
+            csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+
+        self.assertEqual(rows[0]["medication_name"], "'" + medication.name)
+
+    def test_export_refill_requests_as_ndjson_for_regular_user(self):
+        own_request = RefillRequest.objects.create(
+            user=self.regular_user, medication=self.medication
+        )
+        RefillRequest.objects.create(user=self.admin_user, medication=self.medication)
+
+        self.client.login(username=self.regular_user.username, password="userpass")
+
+        response = self.client.get(reverse("export"), {"output": "ndjson"})
+        lines = b"".join(response.streaming_content).splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([json.loads(line)["id"] for line in lines], [own_request.id])
+
+    def test_export_refill_requests_with_invalid_format(self):
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        response = self.client.get(reverse("export"), {"output": "xml"})
+
+        expected_response = {
+            "code": RESPONSE_CODES["VALIDATION_ERROR"],
+            "data": "Invalid export format",
+        }
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), expected_response)
+
+    def test_export_refills_command(self):
+        RefillRequest.objects.create(user=self.regular_user, medication=self.medication)
+        RefillRequest.objects.create(
+            user=self.regular_user, medication=self.medication, status="APPROVED"
+        )
+
+        out = StringIO()
+        call_command(
+            "export_refills", "--format", "ndjson", "--status", "APPROVED", stdout=out
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["status"], "APPROVED")
+
+    def test_list_refill_requests_with_invalid_filter(self):
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        response = self.client.get(self.list_url, {"status": "UNKNOWN"})
+
+        expected_response = {
+            "code": RESPONSE_CODES["VALIDATION_ERROR"],
+            "data": response.data["data"],
+        }
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), expected_response)
+        self.assertIn("status", response.json()["data"])
+
+    def test_list_refill_requests_paginates_with_cursors(self):
+        created_ids = [
+            RefillRequest.objects.create(
+                user=self.regular_user, medication=self.medication
+            ).id
+            for _ in range(3)
+        ]
+
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        first_page = self.client.get(self.list_url, {"page_size": 2}).json()
+        self.assertEqual([r["id"] for r in first_page["data"]], created_ids[:2])
+
+        second_page = self.client.get(
+            self.list_url, {"page_size": 2, "cursor": first_page["next"]}
+        ).json()
+        self.assertEqual([r["id"] for r in second_page["data"]], created_ids[2:])
+        self.assertIsNone(second_page["next"])
+
+    def test_list_refill_requests_query_count_is_constant(self):
+        """
+        Test that listing refill requests does not issue a query per row
+        """
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        def create_refill_requests(count):
+            for i in range(count):
+                medication = Medication.objects.create(
+                    name=f"Medication {i}",
+                    dosage="5mg",
+                    quantity=10,
+                    added_by=self.admin_user,
+                )
+                RefillRequest.objects.create(
+                    user=self.regular_user, medication=medication, status="PENDING"
+                )
+
+        create_refill_requests(1)
+        # Warm up per-user caches so both measurements see the same state
+        self.client.get(self.list_url)
+        with CaptureQueriesContext(connection) as few_rows:
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        create_refill_requests(5)
+        with CaptureQueriesContext(connection) as many_rows:
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["data"]), 6)
+
+        self.assertEqual(len(many_rows), len(few_rows))
+
     def test_list_refill_requests_as_unauthenticated_user(self):
         response = self.client.get(self.list_url)
 
@@ -535,7 +908,7 @@ class RefillRequestApiViewTests(APITestCase):
             user=self.regular_user, medication=self.medication, status="PENDING"
         )
         detail_url = reverse(
-            "refillrequest-detail-update", kwargs={"pk": refill_request.pk}
+            "refill-request-detail-update", kwargs={"pk": refill_request.pk}
         )
 
         self.client.login(username=self.admin_user.username, password="adminpass")
@@ -556,6 +929,59 @@ class RefillRequestApiViewTests(APITestCase):
         self.assertEqual(response.json(), expected_response)
         self.assertEqual(refill_request.status, "APPROVED")
 
+    def test_refill_request_counters_follow_create_and_status_change(self):
+        self.client.login(username=self.regular_user.username, password="userpass")
+        response = self.client.post(
+            self.list_url, {"medication": self.medication.id}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        counter = RefillRequestCounter.objects.get(
+            medication=self.medication, status="PENDING"
+        )
+        self.assertEqual(counter.count, 1)
+
+        self.client.login(username=self.admin_user.username, password="adminpass")
+        detail_url = reverse(
+            "refill-request-detail-update", kwargs={"pk": response.json()["data"]["id"]}
+        )
+        self.client.put(detail_url, {"status": "APPROVED"}, format="json")
+
+        counts = dict(
+            RefillRequestCounter.objects.filter(medication=self.medication).values_list(
+                "status", "count"
+            )
+        )
+        self.assertEqual(counts, {"PENDING": 0, "APPROVED": 1})
+
+    def test_aggregate_refill_counts(self):
+        other_medication = Medication.objects.create(
+            name="Other Medication", dosage="5mg", quantity=10
+        )
+        RefillRequestCounter.objects.adjust(self.medication.id, "PENDING", 2)
+        RefillRequestCounter.objects.adjust(self.medication.id, "APPROVED", 1)
+
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+        response = self.client.get(reverse("aggregate"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(
+            response.json()["data"],
+            [
+                {"name": self.medication.name, "refill_request_count": 3},
+                {"name": other_medication.name, "refill_request_count": 0},
+            ],
+        )
+
+        response = self.client.get(reverse("aggregate"), {"status": "APPROVED"})
+        self.assertCountEqual(
+            response.json()["data"],
+            [
+                {"name": self.medication.name, "refill_request_count": 1},
+                {"name": other_medication.name, "refill_request_count": 0},
+            ],
+        )
+
     def test_update_refill_request_status_as_non_owner(self):
         other_user = UserModel.objects.create_user(
             username="otheruser",
@@ -567,7 +993,7 @@ class RefillRequestApiViewTests(APITestCase):
             user=other_user, medication=self.medication, status="PENDING"
         )
         detail_url = reverse(
-            "refillrequest-detail-update", kwargs={"pk": refill_request.pk}
+            "refill-request-detail-update", kwargs={"pk": refill_request.pk}
         )
 
         self.client.login(username=self.regular_user.username, password="userpass")
@@ -589,7 +1015,7 @@ class RefillRequestApiViewTests(APITestCase):
 
     def test_update_nonexistent_refill_request(self):
         self.client.login(username=self.admin_user.username, password="adminpass")
-        detail_url = reverse("refillrequest-detail-update", kwargs={"pk": 9999})
+        detail_url = reverse("refill-request-detail-update", kwargs={"pk": 9999})
         data = {
             "status": "APPROVED",
         }
@@ -636,7 +1062,7 @@ class RefillRequestApiViewTests(APITestCase):
             user=self.regular_user, medication=self.medication, status="PENDING"
         )
         detail_url = reverse(
-            "refillrequest-detail-update", kwargs={"pk": refill_request.pk}
+            "refill-request-detail-update", kwargs={"pk": refill_request.pk}
         )
         data = {
             "status": "APPROVED",
@@ -651,3 +1077,892 @@ class RefillRequestApiViewTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(response.json(), expected_response)
+
+
+class RebuildRefillCountersCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserModel.objects.create_user(
+            username="testuser",
+            password="userpass",
+            email="test@example.com",
+            role=UserModel.Role.USER,
+        )
+        cls.medication = Medication.objects.create(
+            name="Test Medication", dosage="10mg", quantity=50
+        )
+
+    def test_rebuild_reconciles_drifted_counters(self):
+        RefillRequest.objects.create(user=self.user, medication=self.medication)
+        RefillRequest.objects.create(
+            user=self.user, medication=self.medication, status="DENIED"
+        )
+        RefillRequestCounter.objects.adjust(self.medication.id, "APPROVED", 4)
+
+        call_command("rebuild_refill_counters", stdout=StringIO())
+
+        counts = dict(
+            RefillRequestCounter.objects.filter(medication=self.medication).values_list(
+                "status", "count"
+            )
+        )
+        self.assertEqual(counts, {"PENDING": 1, "DENIED": 1, "APPROVED": 0})
+
+    def test_check_reports_without_fixing(self):
+        RefillRequest.objects.create(user=self.user, medication=self.medication)
+
+        out = StringIO()
+        call_command("rebuild_refill_counters", "--check", stdout=out)
+
+        self.assertIn("Found 1 drifted refill counters.", out.getvalue())
+        self.assertFalse(RefillRequestCounter.objects.exists())
+
+
+class RefillRequestAnalyticsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("analytics")
+        cls.admin_user = UserModel.objects.create_user(
+            username="adminuser",
+            password="adminpass",
+            email="admin@example.com",
+            role=UserModel.Role.ADMIN,
+        )
+        cls.regular_user = UserModel.objects.create_user(
+            username="regularuser",
+            password="userpass",
+            email="user@example.com",
+            role=UserModel.Role.USER,
+        )
+        cls.medication = Medication.objects.create(
+            name="Test Medication", dosage="10mg", quantity=50
+        )
+        call_command("seed_groups", stdout=StringIO())
+
+    def setUp(self):
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+    def create_refill_request(self, requested_at, quantity=1, status="PENDING"):
+        refill_request = RefillRequest.objects.create(
+            user=self.admin_user,
+            medication=self.medication,
+            quantity=quantity,
+            status=status,
+        )
+        RefillRequest.objects.filter(pk=refill_request.pk).update(
+            requested_at=requested_at
+        )
+        return refill_request
+
+    def test_daily_analytics_from_rollups(self):
+        day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.create_refill_request(day - timedelta(days=1, hours=-3), quantity=2)
+        self.create_refill_request(day + timedelta(hours=1), quantity=3)
+        self.create_refill_request(
+            day + timedelta(hours=2), quantity=4, status="DENIED"
+        )
+
+        call_command("rollup_refill_requests", stdout=StringIO())
+
+        response = self.client.get(self.url, {"granularity": "day"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row["count"], row["quantity"]) for row in response.json()["data"]],
+            [(1, 2), (2, 7)],
+        )
+
+        response = self.client.get(self.url, {"granularity": "day", "status": "DENIED"})
+        self.assertEqual(
+            [(row["count"], row["quantity"]) for row in response.json()["data"]],
+            [(1, 4)],
+        )
+
+    def test_analytics_requires_admin(self):
+        self.client.login(username=self.regular_user.username, password="userpass")
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json()["code"], RESPONSE_CODES["FORBIDDEN"])
+
+    @override_settings(REFILL_ANALYTICS_MAX_ROWS=1)
+    def test_analytics_rejects_too_many_rows(self):
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.create_refill_request(hour - timedelta(hours=1))
+        self.create_refill_request(hour)
+        call_command("rollup_refill_requests", stdout=StringIO())
+
+        response = self.client.get(self.url, {"granularity": "hour"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["code"], RESPONSE_CODES["VALIDATION_ERROR"])
+
+        response = self.client.get(
+            self.url, {"granularity": "hour", "start": hour.isoformat()}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["data"]), 1)
+
+    def test_incremental_rollup_picks_up_status_changes(self):
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        refill_request = self.create_refill_request(hour)
+        call_command("rollup_refill_requests", stdout=StringIO())
+
+        refill_request.status = "APPROVED"
+        refill_request.save()
+        call_command("rollup_refill_requests", stdout=StringIO())
+
+        response = self.client.get(
+            self.url, {"granularity": "hour", "status": "APPROVED"}
+        )
+        self.assertEqual(
+            [(row["medication_id"], row["count"]) for row in response.json()["data"]],
+            [(self.medication.id, 1)],
+        )
+        self.assertFalse(RefillRequestRollup.objects.filter(status="PENDING").exists())
+
+    def test_analytics_with_invalid_granularity(self):
+        response = self.client.get(self.url, {"granularity": "month"})
+
+        expected_response = {
+            "code": RESPONSE_CODES["VALIDATION_ERROR"],
+            "data": response.data["data"],
+        }
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), expected_response)
+
+
+@override_settings(MEDICATION_CACHE_BACKEND="lru")
+class MedicationCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.list_url = reverse("medication-list-create")
+        cls.admin_user = UserModel.objects.create_user(
+            username="adminuser",
+            password="adminpass",
+            email="admin@example.com",
+            role=UserModel.Role.ADMIN,
+        )
+        cls.medication = Medication.objects.create(
+            name="Test Medication", dosage="10mg", quantity=50
+        )
+        call_command("seed_groups", stdout=StringIO())
+
+    def setUp(self):
+        BACKENDS["lru"].clear()
+        metrics.reset()
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+    def medication_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q for q in queries if "medication_medication" in q["sql"]]
+
+    def test_repeated_reads_do_not_query_medications(self):
+        detail_url = reverse(
+            "medication-detail-update", kwargs={"pk": self.medication.pk}
+        )
+
+        self.assertTrue(self.medication_queries(self.list_url))
+        self.assertTrue(self.medication_queries(detail_url))
+
+        self.assertEqual(self.medication_queries(self.list_url), [])
+        self.assertEqual(self.medication_queries(detail_url), [])
+
+    def test_write_invalidates_cached_pages(self):
+        self.client.get(self.list_url)
+
+        detail_url = reverse(
+            "medication-detail-update", kwargs={"pk": self.medication.pk}
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(detail_url, {"name": "Renamed"}, format="json")
+
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.json()["data"][0]["name"], "Renamed")
+
+    def test_version_bumped_by_another_process_invalidates_pages(self):
+        """
+        Test that a bump made through a separate cache connection, as from
+        another worker or a management command, invalidates this worker's
+        in-process pages
+        """
+        self.assertEqual(
+            settings.CACHES[settings.MEDICATION_CACHE_ALIAS],
+            {**settings.SHARED_CACHE, "KEY_PREFIX": "medication"},
+        )
+        self.client.get(self.list_url)
+        Medication.objects.filter(pk=self.medication.pk).update(name="Imported")
+
+        with patch("app.versioning.caches", CacheHandler()):
+            bump_catalog_version()
+
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.json()["data"][0]["name"], "Imported")
+
+    def test_metrics_report_hits_and_misses(self):
+        self.client.get(self.list_url)
+        self.client.get(self.list_url)
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counters = response.json()["data"]["counters"]
+        self.assertEqual(counters["medication_cache_misses"], 1)
+        self.assertEqual(counters["medication_cache_hits"], 1)
+
+    def test_metrics_forbidden_for_regular_user(self):
+        UserModel.objects.create_user(
+            username="testuser",
+            password="userpass",
+            email="test@example.com",
+            role=UserModel.Role.USER,
+        )
+        self.client.login(username="testuser", password="userpass")
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class MedicationConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.list_url = reverse("medication-list-create")
+        cls.admin_user = UserModel.objects.create_user(
+            username="adminuser",
+            password="adminpass",
+            email="admin@example.com",
+            role=UserModel.Role.ADMIN,
+        )
+        cls.medication = Medication.objects.create(
+            name="Test Medication", dosage="10mg", quantity=50
+        )
+        cls.detail_url = reverse(
+            "medication-detail-update", kwargs={"pk": cls.medication.pk}
+        )
+        call_command("seed_groups", stdout=StringIO())
+
+    def setUp(self):
+        self.client.login(username=self.admin_user.username, password="adminpass")
+
+    def test_detail_if_none_match_returns_304(self):
+        response = self.client.get(self.detail_url)
+        etag = response["ETag"]
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_detail_if_modified_since_returns_304(self):
+        response = self.client.get(self.detail_url)
+
+        response = self.client.get(
+            self.detail_url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_changes_when_a_row_changes(self):
+        etag = self.client.get(self.list_url)["ETag"]
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.put(self.detail_url, {"quantity": 10}, format="json")
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_etag_changes_when_a_row_is_deleted(self):
+        other = Medication.objects.create(name="Other", dosage="5mg", quantity=5)
+        etag = self.client.get(self.list_url)["ETag"]
+
+        other.delete()
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class AsyncViewTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = UserModel.objects.create_user(
+            username="adminuser",
+            password="adminpass",
+            email="admin@example.com",
+            role=UserModel.Role.ADMIN,
+        )
+        call_command("seed_groups", stdout=StringIO())
+        call_command("seed_medications", stdout=StringIO())
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def call_async(self, view_class, path, **kwargs):
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, user=self.admin_user)
+        response = async_to_sync(view_class.as_view())(request, **kwargs)
+        return response.render()
+
+    def test_views_are_async(self):
+        self.assertTrue(AsyncMedicationApiView.view_is_async)
+        self.assertTrue(AsyncRefillRequestApiView.view_is_async)
+
+    def test_medication_list_matches_sync_view(self):
+        """
+        Test that the async medication list returns the same page as the sync one
+        """
+        url = reverse("medication-list-create") + "?page_size=2"
+
+        response = self.call_async(AsyncMedicationApiView, url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), self.client.get(url).json())
+
+    def test_medication_detail_and_missing_medication(self):
+        """
+        Test async medication detail lookups, including unknown ids
+        """
+        medication = Medication.objects.first()
+        url = reverse("medication-detail-update", kwargs={"pk": medication.pk})
+
+        response = self.call_async(AsyncMedicationApiView, url, pk=medication.pk)
+        self.assertEqual(json.loads(response.content), self.client.get(url).json())
+
+        missing = self.call_async(AsyncMedicationApiView, url, pk=medication.pk + 1000)
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_refill_request_list_matches_sync_view(self):
+        """
+        Test that the async refill list returns the same page as the sync one
+        """
+        url = reverse("refill-request-list-create") + "?page_size=3"
+
+        response = self.call_async(AsyncRefillRequestApiView, url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), self.client.get(url).json())
+
+    @override_settings(MEDICATION_CACHE_BACKEND="lru")
+    def test_cache_calls_run_off_the_event_loop(self):
+        """
+        Test that catalog cache lookups, which may wait on Redis, never block
+        the event loop
+        """
+        lookup = medication_cache.lookup
+        loop_calls = []
+
+        def checked_lookup(key):
+            try:
+                asyncio.get_running_loop()
+                loop_calls.append(key)
+            except RuntimeError:
+                pass
+            return lookup(key)
+
+        medication = Medication.objects.first()
+        with patch("medication.cache.lookup", side_effect=checked_lookup) as spy:
+            self.call_async(AsyncMedicationApiView, reverse("medication-list-create"))
+            url = reverse("medication-detail-update", kwargs={"pk": medication.pk})
+            self.call_async(AsyncMedicationApiView, url, pk=medication.pk)
+
+        self.assertEqual(spy.call_count, 2)
+        self.assertEqual(loop_calls, [])
+
+    @override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMITS={"medication_read": "1/m"})
+    def test_async_views_are_rate_limited(self):
+        """
+        Test that the ratelimit decorator also guards async handlers
+        """
+        caches[settings.RATE_LIMIT_CACHE_ALIAS].clear()
+        url = reverse("medication-list-create")
+        self.call_async(AsyncMedicationApiView, url)
+
+        response = self.call_async(AsyncMedicationApiView, url)
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+
+
+class MedicationImageVariantTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = UserModel.objects.create_user(
+            username="imageadmin",
+            password="adminpass",
+            email="imageadmin@example.com",
+            role=UserModel.Role.ADMIN,
+        )
+        call_command("seed_groups", stdout=StringIO())
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            MEDICATION_IMAGE_SIZES={"thumbnail": 64, "medium": 256},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.admin_user)
+
+    def upload(self, name="photo.png"):
+        output = io.BytesIO()
+        Image.new("RGB", (1200, 800), "teal").save(output, format="PNG")
+        return SimpleUploadedFile(name, output.getvalue(), content_type="image/png")
+
+    def run_worker(self):
+        call_command("run_image_worker", "--once", stdout=StringIO(), stderr=StringIO())
+
+    def test_upload_generates_sized_webp_variants(self):
+        """
+        Test that the image worker writes a WebP derivative for every size
+        of an uploaded image
+        """
+        response = self.client.post(
+            reverse("medication-list-create"),
+            {
+                "name": "Photo Medication",
+                "dosage": "5mg",
+                "quantity": 10,
+                "image": self.upload(),
+            },
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.json()["data"]["image_variants"])
+        self.run_worker()
+
+        medication = Medication.objects.get(name="Photo Medication")
+        self.assertEqual(set(medication.image_variants), {"thumbnail", "medium"})
+        self.assertFalse(MedicationImageJob.objects.exists())
+        response = self.client.get(
+            reverse("medication-detail-update", kwargs={"pk": medication.pk})
+        )
+        for size_name, max_size in (("thumbnail", 64), ("medium", 256)):
+            name = medication.image_variants[size_name]
+            with default_storage.open(name) as derivative:
+                image = Image.open(derivative)
+                self.assertEqual(image.format, "WEBP")
+                self.assertEqual(max(image.size), max_size)
+            self.assertTrue(
+                response.json()["data"]["image_variants"][size_name].endswith(name)
+            )
+
+    def test_identical_images_share_derivatives(self):
+        """
+        Test that derivative names are content-hashed and reused across uploads
+        """
+        for name in ("first", "second"):
+            self.client.post(
+                reverse("medication-list-create"),
+                {
+                    "name": name,
+                    "dosage": "5mg",
+                    "quantity": 10,
+                    "image": self.upload(f"{name}.png"),
+                },
+                format="multipart",
+            )
+        self.run_worker()
+
+        first, second = Medication.objects.order_by("name")
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image_variants, second.image_variants)
+
+    def test_medication_without_image_has_no_variants(self):
+        """
+        Test that medications without an image expose no variant URLs
+        """
+        medication = Medication.objects.create(name="Plain", dosage="5mg", quantity=1)
+
+        data = MedicationSerializer(medication).data
+
+        self.assertIsNone(data["image"])
+        self.assertIsNone(data["image_variants"])
+
+    def test_replacing_image_drops_old_variants(self):
+        """
+        Test that uploading a new image clears the old derivatives until the
+        worker has rendered the new ones
+        """
+        medication = Medication.objects.create(
+            name="Replaced",
+            dosage="5mg",
+            quantity=1,
+            image_variants={"thumbnail": "medications/derivatives/old-64.webp"},
+        )
+        url = reverse("medication-detail-update", kwargs={"pk": medication.pk})
+
+        response = self.client.put(url, {"image": self.upload()}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.json()["data"]["image_variants"])
+        medication.refresh_from_db()
+        self.assertEqual(medication.image_variants, {})
+        self.assertTrue(medication.image_jobs.exists())
+
+    @override_settings(MEDICATION_IMAGE_JOB_MAX_ATTEMPTS=2)
+    def test_failed_jobs_are_retried_then_marked_failed(self):
+        """
+        Test that a job whose image cannot be processed backs off and is
+        marked failed after its last attempt
+        """
+        medication = Medication.objects.create(
+            name="Broken", dosage="5mg", quantity=1, image="medications/missing.png"
+        )
+        job = MedicationImageJob.objects.create(medication=medication)
+
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, MedicationImageJob.Status.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn("FileNotFoundError", job.last_error)
+
+        MedicationImageJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, MedicationImageJob.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+
+class MedicationMediaTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserModel.objects.create_user(
+            username="mediauser",
+            password="userpass",
+            email="mediauser@example.com",
+            role=UserModel.Role.USER,
+        )
+        call_command("seed_groups", stdout=StringIO())
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.content = bytes(range(256)) * 4
+        self.name = default_storage.save(
+            "medications/images/photo.png", io.BytesIO(self.content)
+        )
+        self.url = default_storage.url(self.name)
+        self.client.force_login(self.user)
+
+    def test_serves_file(self):
+        """
+        Test that media files are served to users who may view medications
+        """
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+    def test_serves_byte_ranges(self):
+        """
+        Test single byte ranges, unsatisfiable ranges and stale If-Range
+        """
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(b"".join(response.streaming_content), self.content[10:20])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5000-")
+        self.assertEqual(
+            response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_revalidation(self):
+        """
+        Test that a matching ETag is answered with 304
+        """
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_hands_transfer_to_proxy(self):
+        """
+        Test that the configured front proxy is told which file to send
+        """
+        with override_settings(MEDIA_SENDFILE_BACKEND="nginx"):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/medications/images/photo.png",
+        )
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response.content, b"")
+
+        with override_settings(MEDIA_SENDFILE_BACKEND="apache"):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Sendfile"], default_storage.path(self.name))
+
+    def test_derivatives_are_immutable(self):
+        """
+        Test that content-hashed derivatives may be cached without revalidation
+        """
+        name = default_storage.save(
+            "medications/derivatives/abc-160-q80.webp", io.BytesIO(b"webp")
+        )
+
+        response = self.client.get(default_storage.url(name))
+
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_requires_permission_and_existing_file(self):
+        """
+        Test anonymous access, missing files and paths outside MEDIA_ROOT
+        """
+        missing_url = reverse("medication-media", kwargs={"path": "images/missing.png"})
+        self.assertEqual(
+            self.client.get(missing_url).json()["code"],
+            RESPONSE_CODES["MEDIA_NOT_FOUND"],
+        )
+        outside_url = reverse("medication-media", kwargs={"path": "../../etc/passwd"})
+        self.assertEqual(
+            self.client.get(outside_url).status_code, status.HTTP_404_NOT_FOUND
+        )
+
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_only_serves_medication_media(self):
+        """
+        Test that other MEDIA_ROOT files are not reachable through ``..`` or
+        symlinks, including when the transfer is handed to the proxy
+        """
+        secret = default_storage.save("private/secret.txt", io.BytesIO(b"secret"))
+        os.symlink(
+            default_storage.path(secret),
+            default_storage.path("medications/images/link.txt"),
+        )
+
+        for path in ("../private/secret.txt", "images/../../private/secret.txt"):
+            url = reverse("medication-media", kwargs={"path": path})
+            self.assertEqual(
+                self.client.get(url).status_code, status.HTTP_404_NOT_FOUND
+            )
+        url = reverse("medication-media", kwargs={"path": "images/link.txt"})
+        with override_settings(MEDIA_SENDFILE_BACKEND="nginx"):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MedicationImageUrlTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.medications = Medication.objects.bulk_create(
+            Medication(
+                name=f"Imaged {i}",
+                dosage="5mg",
+                quantity=1,
+                image=f"medications/images/photo {i}.png",
+                image_variants={"thumbnail": f"medications/derivatives/{i}-160.webp"},
+            )
+            for i in range(5)
+        )
+
+    def test_urls_use_request_host(self):
+        request = APIRequestFactory().get("/")
+
+        data = MedicationSerializer(
+            self.medications[0], context={"request": request}
+        ).data
+
+        self.assertEqual(
+            data["image"],
+            "http://testserver/media/medications/images/photo%200.png",
+        )
+        self.assertEqual(
+            data["image_variants"]["thumbnail"],
+            "http://testserver/media/medications/derivatives/0-160.webp",
+        )
+
+    @override_settings(MEDIA_BASE_URL="https://cdn.example.com/media")
+    def test_urls_use_configured_base_url(self):
+        data = MedicationSerializer(self.medications[0]).data
+
+        self.assertEqual(
+            data["image"],
+            "https://cdn.example.com/media/medications/images/photo%200.png",
+        )
+
+    def test_urls_without_request_are_relative(self):
+        data = MedicationSerializer(self.medications[0]).data
+
+        self.assertEqual(data["image"], "/media/medications/images/photo%200.png")
+
+    def test_base_url_is_resolved_once_per_list(self):
+        """
+        Test that serializing many rows resolves the media base URL only once
+        """
+        request = APIRequestFactory().get("/")
+        with patch(
+            "medication.serializers.media_base_url", return_value="http://h/media/"
+        ) as resolve:
+            data = MedicationSerializer(
+                self.medications, many=True, context={"request": request}
+            ).data
+
+        self.assertEqual(len(data), 5)
+        resolve.assert_called_once_with(request)
+
+
+class MedicationImportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("medication-import")
+        cls.admin_user = UserModel.objects.create_user(
+            username="importadmin",
+            password="adminpass",
+            email="importadmin@example.com",
+            role=UserModel.Role.ADMIN,
+        )
+        cls.regular_user = UserModel.objects.create_user(
+            username="importuser",
+            password="userpass",
+            email="importuser@example.com",
+            role=UserModel.Role.USER,
+        )
+        call_command("seed_groups", stdout=StringIO())
+        cls.existing = Medication.objects.create(
+            code="NDC-1", name="Old name", dosage="5mg", quantity=1
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    @override_settings(MEDICATION_IMPORT_BATCH_SIZE=3)
+    def test_csv_import_upserts_and_reports_rejected_rows(self):
+        """
+        Test that valid CSV rows are created or update the medication with
+        the same code, while invalid rows are reported by line
+        """
+        body = (
+            "code,name,dosage,quantity,instructions\n"
+            "NDC-1,Paracetamol,500mg,20,Take with water\n"
+            "NDC-2,Ibuprofen,200mg,abc,\n"
+            "NDC-3,Aspirin,81mg,25,\n"
+            "NDC-4,Metformin,500mg,30,\n"
+            "NDC-4,Metformin XR,750mg,30,\n"
+        )
+
+        response = self.client.post(self.url, body, content_type="text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()["data"]
+        self.assertEqual((data["created"], data["updated"], data["failed"]), (2, 1, 1))
+        self.assertEqual(data["errors"][0]["line"], 3)
+        self.assertIn("quantity", data["errors"][0]["errors"])
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Paracetamol")
+        self.assertIsNone(self.existing.added_by)
+        self.assertEqual(Medication.objects.get(code="NDC-4").dosage, "750mg")
+        self.assertEqual(Medication.objects.get(code="NDC-3").added_by, self.admin_user)
+
+    def test_ndjson_upload(self):
+        """
+        Test importing an NDJSON file upload, including malformed lines
+        """
+        upload = SimpleUploadedFile(
+            "formulary.ndjson",
+            b'{"code": "NDC-9", "name": "Lisinopril", "dosage": "10mg", "quantity": 30}\n'
+            b"\n"
+            b"not json\n",
+        )
+
+        response = self.client.post(self.url, {"file": upload}, format="multipart")
+
+        data = response.json()["data"]
+        self.assertEqual((data["created"], data["failed"]), (1, 1))
+        self.assertEqual(data["errors"][0]["line"], 3)
+        self.assertTrue(Medication.objects.filter(code="NDC-9").exists())
+
+    @override_settings(MEDICATION_IMPORT_BATCH_SIZE=1)
+    def test_unreadable_rows_stop_the_import_after_committed_batches(self):
+        """
+        Test that a decoding error reports the batches already written and
+        the line where reading stopped, and invalidates the catalog cache
+        """
+        body = b"code,name,dosage,quantity\nA1,Aspirin,81mg,10\nA2,Bad \xff,1mg,1\n"
+
+        with patch("medication.imports.bump_catalog_version") as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, body, content_type="text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()["data"]
+        self.assertEqual((data["created"], data["failed"]), (1, 1))
+        self.assertEqual(data["errors"][0]["line"], 3)
+        self.assertIn(
+            "Unreadable file", data["errors"][0]["errors"]["non_field_errors"][0]
+        )
+        self.assertTrue(Medication.objects.filter(code="A1").exists())
+        bump.assert_called_once_with()
+
+    def test_upsert_reports_the_split_returned_by_the_statement(self):
+        """
+        Test that created and updated counts come from the upsert itself and
+        that updated rows keep their other columns
+        """
+        created_at = self.existing.created_at
+        rows = {
+            code: {"code": code, "name": name, "dosage": "1mg", "quantity": 1}
+            for code, name in (("NDC-1", "Renamed"), ("NDC-7", "Losartan"))
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(upsert_medications(rows, self.admin_user), (1, 1))
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Renamed")
+        self.assertEqual(self.existing.created_at, created_at)
+        self.assertIsNone(self.existing.added_by)
+        created = Medication.objects.get(code="NDC-7")
+        self.assertEqual(created.added_by, self.admin_user)
+        self.assertEqual(created.image_variants, {})
+
+    def test_rejects_unknown_formats_and_users_without_permission(self):
+        response = self.client.post(
+            self.url, {"file": SimpleUploadedFile("list.txt", b"x")}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_login(self.regular_user)
+        response = self.client.post(self.url, "code\n", content_type="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as file:
+            file.write("code,name,dosage,quantity\nNDC-5,Atorvastatin,20mg,30\n,,,\n")
+        self.addCleanup(os.remove, file.name)
+        stdout, stderr = StringIO(), StringIO()
+
+        call_command("import_medications", file.name, stdout=stdout, stderr=stderr)
+
+        self.assertIn("1 created, 0 updated, 1 rejected", stdout.getvalue())
+        self.assertIn("Line 3:", stderr.getvalue())
+        self.assertTrue(Medication.objects.filter(code="NDC-5").exists())
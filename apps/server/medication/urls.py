@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import MedicationApiView, RefillRequestApiView
+from .async_views import AsyncMedicationApiView, AsyncRefillRequestApiView
+from .views import MedicationApiView, MedicationImportApiView, RefillRequestApiView
+
+if settings.ASYNC_VIEWS:
+    MedicationApiView = AsyncMedicationApiView
+    RefillRequestApiView = AsyncRefillRequestApiView
 
 urlpatterns = [
     path("", MedicationApiView.as_view(), name="medication-list-create"),
+    path("import/", MedicationImportApiView.as_view(), name="medication-import"),
     path(
         "<int:pk>/",
         MedicationApiView.as_view(),
@@ -11,6 +18,8 @@ urlpatterns = [
     ),
     path("refill-request/", RefillRequestApiView.as_view(), name="refill-request-list-create"),
     path("refill-request/aggregate/", RefillRequestApiView.as_view(), name="aggregate"),
+    path("refill-request/analytics/", RefillRequestApiView.as_view(), name="analytics"),
+    path("refill-request/export/", RefillRequestApiView.as_view(), name="export"),
     path(
         "refill-request/<int:pk>/",
         RefillRequestApiView.as_view(),
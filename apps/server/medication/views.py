@@ -1,74 +1,208 @@
+import posixpath
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
-from django.db.models import Count
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
     HTTP_400_BAD_REQUEST,
+    HTTP_403_FORBIDDEN,
     HTTP_404_NOT_FOUND,
 )
 from rest_framework.views import APIView
 
+from app.media import media_base_url, media_response
+from app.pagination import InvalidCursor, KeysetPaginator
 from app.response_codes import RESPONSE_CODES
-from app.utils import json_response, ratelimit
+from app.streaming import stream_json_response, wants_stream
+from app.utils import (
+    conditional_response,
+    json_response,
+    make_etag,
+    ratelimit,
+    set_validators,
+)
 
-from .models import Medication, RefillRequest
-from .permissions import HasMedicationPermission, HasRefillRequestPermission
-from .serializers import MedicationSerializer, RefillRequestDetailSerializer, RefillRequestSerializer
+from . import cache as medication_cache
+from .cache import bump_catalog_version
+from .exports import EXPORT_FORMATS, export_refill_requests
+from .images import DERIVATIVE_DIR, enqueue_image_job
+from .imports import IMPORT_FORMATS, detect_format, import_medications
+from .models import (
+    Medication,
+    RefillRequest,
+    RefillRequestCounter,
+    RefillRequestRollup,
+)
+from .permissions import (
+    HasMedicationImportPermission,
+    HasMedicationPermission,
+    HasRefillRequestPermission,
+)
+from .serializers import (
+    MedicationSerializer,
+    RefillAnalyticsFilterSerializer,
+    RefillRequestDetailSerializer,
+    RefillRequestFilterSerializer,
+    RefillRequestSerializer,
+)
 
 
 class MedicationApiView(APIView):
     permission_classes = [IsAuthenticated, HasMedicationPermission]
 
-    @method_decorator(ratelimit(key="ip", rate="10/m", method="GET", block=True))
+    @method_decorator(ratelimit("medication_read", key="user", method="GET"))
     def get(self, request, pk=None):
-        if getattr(request, "limited", False):
-            return json_response(
-                code=RESPONSE_CODES["TOO_MANY_REQUESTS"],
-                data=None,
-                status_code=HTTP_400_BAD_REQUEST,
-            )
+        # Absolute image URLs depend on the host the request was made to
+        base_url = request.build_absolute_uri("/")
 
         if pk:
-            try:
-                medication = Medication.objects.get(pk=pk)
-            except Medication.DoesNotExist:
-                return json_response(
-                    code=RESPONSE_CODES["MEDICATION_NOT_FOUND"],
-                    data=None,
-                    status_code=HTTP_404_NOT_FOUND,
-                )
-            serializer = MedicationSerializer(medication, context={"request": request})
+            return self.get_medication_detail(request, pk, base_url)
+        return self.list_medications(request, base_url)
+
+    def get_medication_detail(self, request, pk, base_url):
+        """
+        Return a single medication, answering conditional requests with 304.
+        """
+        cache_key, payload = medication_cache.lookup(f"detail:{pk}:{base_url}")
+        if payload is not None:
+            return self.cached_response(request, "MEDICATION_DETAIL_SUCCESS", payload)
+
+        try:
+            medication = Medication.objects.get(pk=pk)
+        except Medication.DoesNotExist:
             return json_response(
-                code=RESPONSE_CODES["MEDICATION_DETAIL_SUCCESS"],
-                data=serializer.data,
-                status_code=HTTP_200_OK,
-            )
-        else:
-            medications = Medication.objects.all()
-            serializer = MedicationSerializer(
-                medications, many=True, context={"request": request}
+                code=RESPONSE_CODES["MEDICATION_NOT_FOUND"],
+                data=None,
+                status_code=HTTP_404_NOT_FOUND,
             )
-            return json_response(
-                code=RESPONSE_CODES["MEDICATION_LIST_SUCCESS"],
-                data=serializer.data,
-                status_code=HTTP_200_OK,
+        return self.medication_detail_response(
+            request, pk, base_url, medication, cache_key
+        )
+
+    def medication_detail_response(self, request, pk, base_url, medication, cache_key):
+        etag = make_etag(pk, medication.updated_at.isoformat(), base_url)
+        last_modified = int(medication.updated_at.timestamp())
+
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        serializer = MedicationSerializer(medication, context={"request": request})
+        payload = {
+            "data": serializer.data,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        medication_cache.store(cache_key, payload)
+        return self.payload_response("MEDICATION_DETAIL_SUCCESS", payload)
+
+    def list_medications(self, request, base_url):
+        """
+        Return one cursor page of medications, answering conditional requests
+        with 304 when neither the page's rows nor its cursors changed. With
+        ``stream=true`` the whole catalog is streamed instead.
+        """
+        if wants_stream(request):
+            # Resolve media URLs once rather than for every chunk
+            context = {"request": request, "media_base_url": media_base_url(request)}
+            return stream_json_response(
+                RESPONSE_CODES["MEDICATION_LIST_SUCCESS"],
+                Medication.objects.order_by("created_at", "id"),
+                lambda rows: MedicationSerializer(
+                    rows, many=True, context=context
+                ).data,
             )
 
-    @method_decorator(ratelimit(key="ip", rate="5/m", method="POST", block=True))
-    def post(self, request):
-        if getattr(request, "limited", False):
+        paginator = KeysetPaginator(ordering_field="created_at")
+        cursor = request.query_params.get("cursor", "")
+        page_size = paginator.get_page_size(request)
+
+        cache_key, payload = medication_cache.lookup(
+            f"list:{cursor}:{page_size}:{base_url}"
+        )
+        if payload is not None:
+            return self.cached_response(request, "MEDICATION_LIST_SUCCESS", payload)
+
+        try:
+            medications, pagination = paginator.paginate(
+                Medication.objects.all(), request
+            )
+        except InvalidCursor:
             return json_response(
-                code=RESPONSE_CODES["TOO_MANY_REQUESTS"],
-                data=None,
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data="Invalid cursor",
                 status_code=HTTP_400_BAD_REQUEST,
             )
+        return self.medication_list_response(
+            request, base_url, cursor, page_size, medications, pagination, cache_key
+        )
+
+    def medication_list_response(
+        self, request, base_url, cursor, page_size, medications, pagination, cache_key
+    ):
+        # Row ids are part of the tag so removals change it as well
+        etag = make_etag(
+            cursor,
+            page_size,
+            base_url,
+            pagination["next"],
+            pagination["prev"],
+            *(f"{m.pk}@{m.updated_at.isoformat()}" for m in medications),
+        )
+        last_modified = (
+            int(max(m.updated_at for m in medications).timestamp())
+            if medications
+            else None
+        )
+
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        serializer = MedicationSerializer(
+            medications, many=True, context={"request": request}
+        )
+        payload = {
+            "data": serializer.data,
+            "pagination": pagination,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        medication_cache.store(cache_key, payload)
+        return self.payload_response("MEDICATION_LIST_SUCCESS", payload)
 
+    def cached_response(self, request, code, payload):
+        not_modified = conditional_response(
+            request, payload["etag"], payload["last_modified"]
+        )
+        if not_modified is not None:
+            return not_modified
+        return self.payload_response(code, payload)
+
+    def payload_response(self, code, payload):
+        response = json_response(
+            code=RESPONSE_CODES[code],
+            data=payload["data"],
+            status_code=HTTP_200_OK,
+            pagination=payload.get("pagination"),
+        )
+        return set_validators(response, payload["etag"], payload["last_modified"])
+
+    @method_decorator(ratelimit("medication_write", key="user", method="POST"))
+    def post(self, request):
         serializer = MedicationSerializer(
             data=request.data, context={"request": request}
         )
         if serializer.is_valid():
-            serializer.save(added_by=request.user)
+            self.save_medication(serializer, added_by=request.user)
+            transaction.on_commit(bump_catalog_version)
             return json_response(
                 code=RESPONSE_CODES["MEDICATION_CREATED"],
                 data=serializer.data,
@@ -80,7 +214,7 @@ class MedicationApiView(APIView):
             status_code=HTTP_400_BAD_REQUEST,
         )
 
-    @method_decorator(ratelimit(key="ip", rate="5/m", method="PUT", block=True))
+    @method_decorator(ratelimit("medication_write", key="user", method="PUT"))
     def put(self, request, pk=None):
         """
         Update an existing medication's details.
@@ -105,7 +239,8 @@ class MedicationApiView(APIView):
             medication, data=request.data, partial=True, context={"request": request}
         )
         if serializer.is_valid():
-            serializer.save()
+            self.save_medication(serializer)
+            transaction.on_commit(bump_catalog_version)
             return json_response(
                 code=RESPONSE_CODES["MEDICATION_UPDATED"],
                 data=serializer.data,
@@ -118,7 +253,20 @@ class MedicationApiView(APIView):
             status_code=HTTP_400_BAD_REQUEST,
         )
 
-    @method_decorator(ratelimit(key="ip", rate="5/m", method="DELETE", block=True))
+    def save_medication(self, serializer, **kwargs):
+        """
+        Save the medication in one transaction with, when a new image was
+        uploaded, the job that renders its derivatives. The old image's
+        derivatives are dropped so they are never shown next to the new one.
+        """
+        with transaction.atomic():
+            if "image" not in serializer.validated_data:
+                return serializer.save(**kwargs)
+            medication = serializer.save(image_variants={}, **kwargs)
+            enqueue_image_job(medication)
+        return medication
+
+    @method_decorator(ratelimit("medication_write", key="user", method="DELETE"))
     def delete(self, request, pk=None):
         """
         Delete an existing medication.
@@ -140,6 +288,7 @@ class MedicationApiView(APIView):
             )
 
         medication.delete()
+        transaction.on_commit(bump_catalog_version)
         return json_response(
             code=RESPONSE_CODES["MEDICATION_DELETED"],
             data=None,
@@ -147,18 +296,48 @@ class MedicationApiView(APIView):
         )
 
 
-class RefillRequestApiView(APIView):
-    permission_classes = [IsAuthenticated, HasRefillRequestPermission]
+class MedicationImportApiView(APIView):
+    permission_classes = [IsAuthenticated, HasMedicationImportPermission]
+    # Raw CSV and NDJSON bodies are read from the request stream unparsed
+    parser_classes = [MultiPartParser]
 
-    @method_decorator(ratelimit(key="ip", rate="5/m", method="POST", block=True))
+    @method_decorator(ratelimit("medication_import", key="user", method="POST"))
     def post(self, request):
-        if getattr(request, "limited", False):
+        """
+        Create or update medications in bulk from a CSV or NDJSON request
+        body, or a multipart ``file`` upload, matching existing medications
+        on their code. Responds with the number of rows created, updated and
+        rejected, and the errors of each rejected row.
+        """
+        import_format = detect_format(content_type=request.content_type)
+        if import_format is not None:
+            lines = request.stream or []
+        else:
+            lines = request.FILES.get("file")
+            import_format = request.data.get("format") or detect_format(
+                filename=getattr(lines, "name", "")
+            )
+
+        if lines is None or import_format not in IMPORT_FORMATS:
             return json_response(
-                code=RESPONSE_CODES["TOO_MANY_REQUESTS"],
-                data=None,
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data="Send a CSV or NDJSON file",
                 status_code=HTTP_400_BAD_REQUEST,
             )
 
+        report = import_medications(lines, import_format, added_by=request.user)
+        return json_response(
+            code=RESPONSE_CODES["MEDICATION_IMPORT_SUCCESS"],
+            data=report.as_dict(),
+            status_code=HTTP_200_OK,
+        )
+
+
+class RefillRequestApiView(APIView):
+    permission_classes = [IsAuthenticated, HasRefillRequestPermission]
+
+    @method_decorator(ratelimit("refill_write", key="user", method="POST"))
+    def post(self, request):
         serializer = RefillRequestSerializer(data=request.data)
         if serializer.is_valid():
             medication_id = request.data.get("medication")
@@ -171,7 +350,13 @@ class RefillRequestApiView(APIView):
                     status_code=HTTP_404_NOT_FOUND,
                 )
 
-            refill_request = serializer.save(user=request.user, medication=medication)
+            with transaction.atomic():
+                refill_request = serializer.save(
+                    user=request.user, medication=medication
+                )
+                RefillRequestCounter.objects.adjust(
+                    medication.id, refill_request.status, 1
+                )
             return json_response(
                 code=RESPONSE_CODES["REFILL_REQUEST_CREATED"],
                 data=RefillRequestSerializer(refill_request).data,
@@ -187,22 +372,60 @@ class RefillRequestApiView(APIView):
     def get(self, request):
         """
         List refill requests for the authenticated user.
+
+        Admins see every request; results can be narrowed with the ``status``,
+        ``medication``, ``user``, ``requested_after`` and ``requested_before``
+        query parameters and are paginated by ``requested_at``, or streamed in
+        full with ``stream=true``.
         """
         if request.path.endswith("/aggregate/"):
             return self.get_aggregate_refill_counts(request)
-        
-        refill_requests = None
-        if request.user.role == "ADMIN":
-            refill_requests = RefillRequest.objects.all()
-        else:
-            refill_requests = RefillRequest.objects.filter(user=request.user)
+        if request.path.endswith("/analytics/"):
+            return self.get_refill_analytics(request)
+        if request.path.endswith("/export/"):
+            return self.export_refill_requests(request)
+
+        filters = RefillRequestFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return json_response(
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data=filters.errors,
+                status_code=HTTP_400_BAD_REQUEST,
+            )
+
+        refill_requests = self.visible_refill_requests(request, filters)
+        if wants_stream(request):
+            return stream_json_response(
+                RESPONSE_CODES["REFILL_REQUEST_LIST_SUCCESS"],
+                refill_requests.order_by("requested_at", "id"),
+                lambda rows: RefillRequestDetailSerializer(rows, many=True).data,
+            )
+
+        paginator = KeysetPaginator(ordering_field="requested_at")
+        try:
+            refill_requests, pagination = paginator.paginate(refill_requests, request)
+        except InvalidCursor:
+            return json_response(
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data="Invalid cursor",
+                status_code=HTTP_400_BAD_REQUEST,
+            )
+
         serializer = RefillRequestDetailSerializer(refill_requests, many=True)
         return json_response(
             code=RESPONSE_CODES["REFILL_REQUEST_LIST_SUCCESS"],
             data=serializer.data,
             status_code=HTTP_200_OK,
+            pagination=pagination,
         )
 
+    def visible_refill_requests(self, request, filters):
+        # Join the nested medication in the same query to avoid one lookup per row
+        refill_requests = RefillRequest.objects.select_related("medication")
+        if request.user.role != "ADMIN":
+            refill_requests = refill_requests.filter(user=request.user)
+        return filters.filter_queryset(refill_requests)
+
     def put(self, request, pk=None):
         """
         Update the status of a specific refill request.
@@ -214,43 +437,178 @@ class RefillRequestApiView(APIView):
                 status_code=HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            refill_request = RefillRequest.objects.get(pk=pk)
-        except RefillRequest.DoesNotExist:
+        with transaction.atomic():
+            try:
+                # Lock the row so concurrent status changes keep counters exact
+                refill_request = RefillRequest.objects.select_for_update().get(pk=pk)
+            except RefillRequest.DoesNotExist:
+                return json_response(
+                    code=RESPONSE_CODES["REFILL_REQUEST_NOT_FOUND"],
+                    data=None,
+                    status_code=HTTP_404_NOT_FOUND,
+                )
+
+            new_status = request.data.get("status")
+            if new_status not in dict(RefillRequest.STATUS_CHOICES):
+                return json_response(
+                    code=RESPONSE_CODES["VALIDATION_ERROR"],
+                    data="Invalid status",
+                    status_code=HTTP_400_BAD_REQUEST,
+                )
+
+            old_status = refill_request.status
+            refill_request.status = new_status
+            refill_request.save()
+            if old_status != new_status:
+                medication_id = refill_request.medication_id
+                RefillRequestCounter.objects.adjust(medication_id, old_status, -1)
+                RefillRequestCounter.objects.adjust(medication_id, new_status, 1)
+
+        return json_response(
+            code=RESPONSE_CODES["REFILL_REQUEST_UPDATED"],
+            data=RefillRequestSerializer(refill_request).data,
+            status_code=HTTP_200_OK,
+        )
+
+    def get_aggregate_refill_counts(self, request):
+        """
+        Return the count of refill requests for each medication, optionally
+        restricted to a single ``status``.
+
+        Counts are read from the incrementally maintained counter table, so
+        the cost depends on the number of medications rather than requests.
+        """
+        status_filter = request.query_params.get("status")
+        counter_filter = None
+        if status_filter:
+            if status_filter not in dict(RefillRequest.STATUS_CHOICES):
+                return json_response(
+                    code=RESPONSE_CODES["VALIDATION_ERROR"],
+                    data="Invalid status",
+                    status_code=HTTP_400_BAD_REQUEST,
+                )
+            counter_filter = Q(refill_counters__status=status_filter)
+
+        refill_counts = Medication.objects.annotate(
+            refill_request_count=Coalesce(
+                Sum("refill_counters__count", filter=counter_filter), 0
+            )
+        ).values("name", "refill_request_count")
+
+        return json_response(
+            code=RESPONSE_CODES["REFILL_REQUEST_AGGREGATE_SUCCESS"],
+            data=list(refill_counts),
+            status_code=HTTP_200_OK,
+        )
+
+    def get_refill_analytics(self, request):
+        """
+        Return refill counts and quantities per medication per hour, day or
+        week, read from the pre-aggregated rollup tables.
+
+        The figures are system-wide, so only admins may read them, and a
+        query matching more than ``REFILL_ANALYTICS_MAX_ROWS`` rows is
+        rejected rather than returned in full.
+        """
+        if request.user.role != "ADMIN":
             return json_response(
-                code=RESPONSE_CODES["REFILL_REQUEST_NOT_FOUND"],
+                code=RESPONSE_CODES["FORBIDDEN"],
                 data=None,
-                status_code=HTTP_404_NOT_FOUND,
+                status_code=HTTP_403_FORBIDDEN,
+            )
+
+        filters = RefillAnalyticsFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return json_response(
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data=filters.errors,
+                status_code=HTTP_400_BAD_REQUEST,
             )
 
-        new_status = request.data.get("status")
-        if new_status not in dict(RefillRequest.STATUS_CHOICES):
+        rollups = (
+            filters.filter_queryset(RefillRequestRollup.objects.all())
+            .values("medication_id", "bucket_start")
+            .annotate(
+                name=F("medication__name"),
+                count=Sum("count"),
+                quantity=Sum("quantity"),
+            )
+            .order_by("bucket_start", "medication_id")
+        )
+        max_rows = settings.REFILL_ANALYTICS_MAX_ROWS
+        rows = list(rollups[: max_rows + 1])
+        if len(rows) > max_rows:
             return json_response(
                 code=RESPONSE_CODES["VALIDATION_ERROR"],
-                data="Invalid status",
+                data=(
+                    f"More than {max_rows} rows match; narrow the start/end "
+                    "window or use a coarser granularity"
+                ),
                 status_code=HTTP_400_BAD_REQUEST,
             )
 
-        refill_request.status = new_status
-        refill_request.save()
         return json_response(
-            code=RESPONSE_CODES["REFILL_REQUEST_UPDATED"],
-            data=RefillRequestSerializer(refill_request).data,
+            code=RESPONSE_CODES["REFILL_REQUEST_ANALYTICS_SUCCESS"],
+            data=rows,
             status_code=HTTP_200_OK,
         )
-    
-    def get_aggregate_refill_counts(self, request):
+
+    def export_refill_requests(self, request):
         """
-        Return the count of refill requests for each medication.
+        Stream refill requests as CSV or NDJSON (``output=csv|ndjson``) using
+        the same filters and visibility rules as the list endpoint.
         """
-        refill_counts = (
-            Medication.objects
-            .annotate(refill_request_count=Count('refill_requests'))
-            .values('name', 'refill_request_count')
+        export_format = request.query_params.get("output", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return json_response(
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data="Invalid export format",
+                status_code=HTTP_400_BAD_REQUEST,
+            )
+
+        filters = RefillRequestFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return json_response(
+                code=RESPONSE_CODES["VALIDATION_ERROR"],
+                data=filters.errors,
+                status_code=HTTP_400_BAD_REQUEST,
+            )
+
+        refill_requests = RefillRequest.objects.all()
+        if request.user.role != "ADMIN":
+            refill_requests = refill_requests.filter(user=request.user)
+        refill_requests = filters.filter_queryset(refill_requests)
+
+        response = StreamingHttpResponse(
+            export_refill_requests(refill_requests, export_format),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="refill-requests.{export_format}"'
         )
+        return response
 
-        return json_response(
-            code=RESPONSE_CODES["REFILL_REQUEST_AGGREGATE_SUCCESS"],
-            data=list(refill_counts),
-            status_code=HTTP_200_OK,
+
+class MedicationMediaApiView(APIView):
+    permission_classes = [IsAuthenticated, HasMedicationPermission]
+
+    def get(self, request, path):
+        """
+        Serve an uploaded medication image or one of its derivatives to users
+        allowed to view medications. Derivative names are content-hashed, so
+        those may be cached indefinitely.
+        """
+        name = posixpath.normpath(f"medications/{path}")
+        response = media_response(
+            request,
+            name,
+            directory="medications",
+            immutable=name.startswith(f"{DERIVATIVE_DIR}/"),
         )
+        if response is None:
+            return json_response(
+                code=RESPONSE_CODES["MEDIA_NOT_FOUND"],
+                data=None,
+                status_code=HTTP_404_NOT_FOUND,
+            )
+        return response